@@ -0,0 +1,150 @@
+import time
+
+from openai.types.chat import ParsedChatCompletionMessage, ParsedFunctionToolCall
+from openai.types.chat.parsed_function_tool_call import ParsedFunction
+
+from src.llm.evolution import tool
+from src.llm.history import ChatHistory
+from src.llm.session.actor.assistant import AssistantActor
+from src.llm.session.actor.system import SystemActor
+from src.llm.session.session import Session
+from src.llm.spawner.tool import create_tool_actor_spawner
+
+TOOL_LATENCY_SECONDS = 0.2
+
+
+@tool
+def benchmark__slow_tool(index: int) -> int:
+    """Tool that simulates a slow network call, e.g. a web search
+    Args:
+        index (int): The index of the tool call
+    Returns:
+        int: The same index
+    """
+    time.sleep(TOOL_LATENCY_SECONDS)
+    return index
+
+
+benchmark__slow_tool.read_only = True
+written: list[int] = []
+
+
+@tool
+def benchmark__slow_write(index: int) -> int:
+    """Tool that simulates a slow write, e.g. adding to the knowledge base
+    Args:
+        index (int): The index of the tool call
+    Returns:
+        int: The same index
+    """
+    time.sleep(TOOL_LATENCY_SECONDS)
+    written.append(index)
+    return index
+
+
+@tool
+def benchmark__read_writes(index: int) -> list[int]:
+    """Tool that reads what the writes left behind
+    Args:
+        index (int): The index of the tool call
+    Returns:
+        list[int]: The writes done so far
+    """
+    return list(written)
+
+
+benchmark__read_writes.read_only = True
+
+
+def scripted_assistant(tool_calls: int, *, tools: list[str] | None = None) -> AssistantActor:
+    def response_factory(history: ChatHistory):
+        if history[-1]["role"] == "tool":
+            return ParsedChatCompletionMessage[None](role="assistant", content="done")
+
+        return ParsedChatCompletionMessage[None](
+            role="assistant",
+            content="",
+            tool_calls=[
+                ParsedFunctionToolCall(
+                    id=f"call-{index}",
+                    type="function",
+                    function=ParsedFunction(
+                        name=tools[index] if tools else benchmark__slow_tool.invoke.__name__,
+                        arguments=f'{{"index": {index}}}',
+                        parsed_arguments={"index": index},
+                    ),
+                )
+                for index in range(tool_calls)
+            ],
+        )
+
+    return AssistantActor.with_stream(response_factory=response_factory)
+
+
+def round_latency(*, tool_calls: int, max_concurrent_tool_calls: int) -> float:
+    session = Session(
+        looped=False,
+        static_actors=[SystemActor.with_message("benchmark")],
+        main_assistant_actor=scripted_assistant(tool_calls),
+        tool_actor_spawner=create_tool_actor_spawner(),
+        max_concurrent_tool_calls=max_concurrent_tool_calls,
+    )
+
+    # Keep the knowledge base out of the measurement
+    session.state.chat_history_persistence = None
+
+    start = time.perf_counter()
+    session.start()
+    elapsed = time.perf_counter() - start
+
+    results = [
+        message["tool_call_id"]
+        for history in session.state.chat_histories
+        for message in history
+        if message["role"] == "tool"
+    ]
+    assert results == [f"call-{index}" for index in range(tool_calls)], results
+
+    return elapsed
+
+
+def check_ordering():
+    # Reads after a write in the same message must see it, reads before it may still run ahead
+    tools = [
+        benchmark__slow_tool.invoke.__name__,
+        benchmark__slow_write.invoke.__name__,
+        benchmark__read_writes.invoke.__name__,
+    ]
+    session = Session(
+        looped=False,
+        static_actors=[SystemActor.with_message("benchmark")],
+        main_assistant_actor=scripted_assistant(len(tools), tools=tools),
+        tool_actor_spawner=create_tool_actor_spawner(),
+        max_concurrent_tool_calls=4,
+    )
+    session.state.chat_history_persistence = None
+    session.start()
+
+    results = [
+        message["content"]
+        for history in session.state.chat_histories
+        for message in history
+        if message["role"] == "tool"
+    ]
+    assert "[1]" in results[-1], results
+
+
+def main():
+    check_ordering()
+    print(f"Each tool call takes {TOOL_LATENCY_SECONDS}s")
+    print(f"{'tool calls':>10} | {'sequential':>10} | {'4 workers':>10} | {'8 workers':>10}")
+    for tool_calls in [1, 2, 4, 8]:
+        timings = [
+            round_latency(tool_calls=tool_calls, max_concurrent_tool_calls=workers)
+            for workers in [1, 4, 8]
+        ]
+        print(f"{tool_calls:>10} | " + " | ".join(f"{t:>9.2f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
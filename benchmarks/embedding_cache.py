@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+import time
+
+import chromadb
+from chromadb.api.types import Documents, Embeddings
+
+from benchmarks.knowledge_base_retrieval import BagOfWordsEmbeddingFunction
+from src.llm.session.persistence import ChatHistoryPersistence
+from src.vector_db.cached_embeddings import CachedEmbeddingFunction
+from src.vector_db.collections import CollectionCache
+from src.vector_db.embedding_cache import EmbeddingCache
+from src.vector_db.knowledge_base import KnowledgeBase
+from src.vector_db.writer import BatchWriter
+
+SESSIONS = 5
+TURNS = 20
+EMBEDDING_SECONDS_PER_TEXT = 0.002
+
+SYSTEM_PROMPT = "system: You are SEA, a self-evolving assistant."
+FACTS = [f"The user {verb} {thing}" for verb in ["likes", "owns", "uses"] for thing in ["rust", "a cat", "neovim", "tea"]]
+QUERIES = ["what does the user like", "does the user have pets", "which editor does the user use"]
+
+
+class CountingEmbeddingFunction(BagOfWordsEmbeddingFunction):
+    # Sleeps per text like the real model, and counts every text it is asked to embed
+    embedded = 0
+
+    def __call__(self, input: Documents) -> Embeddings:
+        CountingEmbeddingFunction.embedded += len(input)
+        time.sleep(EMBEDDING_SECONDS_PER_TEXT * len(input))
+        return super().__call__(input)
+
+
+def session(knowledge_base: KnowledgeBase, writer: BatchWriter, rng: random.Random, number: int):
+    # Every session starts from a fresh process: new persistence, same system prompt and greetings
+    persistence = ChatHistoryPersistence(collection="chat-history", writer=writer)
+    history = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "hi"}]
+    for turn in range(TURNS):
+        history.append({"role": "assistant", "content": f"answer {turn} of session {number}"})
+        persistence.persist(history)  # type: ignore
+        knowledge_base.add("facts", [rng.choice(FACTS)])
+        knowledge_base.search("facts", [rng.choice(QUERIES)], limit=3)
+    persistence.on_round_end()
+
+
+def run(path: str, *, cached: bool) -> tuple[float, int, EmbeddingCache | None]:
+    CountingEmbeddingFunction.embedded = 0
+    client = chromadb.PersistentClient(path=os.path.join(path, "chroma"))
+    rng = random.Random(0)
+    cache: EmbeddingCache | None = None
+
+    start = time.perf_counter()
+    for number in range(SESSIONS):
+        embedding_function = CountingEmbeddingFunction()
+        if cached:
+            # Reopened from disk, like after a restart
+            if cache is not None:
+                cache.save()
+            cache = EmbeddingCache(path=os.path.join(path, "embeddings"))
+            embedding_function = CachedEmbeddingFunction(embedding_function, cache=cache)
+
+        collections = CollectionCache(client=client, embedding_function=embedding_function)
+        writer = BatchWriter(collections=collections)
+        knowledge_base = KnowledgeBase(collections=collections, writer=writer)
+        session(knowledge_base, writer, rng, number)
+        knowledge_base.flush()
+        writer.close()
+
+    return time.perf_counter() - start, CountingEmbeddingFunction.embedded, cache
+
+
+def main():
+    print(f"{SESSIONS} sessions of {TURNS} turns, {EMBEDDING_SECONDS_PER_TEXT * 1000:.0f}ms per embedded text")
+    print(f"{'embeddings':>10} | {'texts embedded':>14} | {'time':>7}")
+    for cached in [False, True]:
+        with tempfile.TemporaryDirectory() as path:
+            elapsed, embedded, cache = run(path, cached=cached)
+            print(f"{'cached' if cached else 'uncached':>10} | {embedded:>14} | {elapsed:>6.2f}s")
+            if cache is not None:
+                stats = cache.stats
+                print(
+                    f"Last session: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions "
+                    f"(hit rate {stats.hit_rate:.0%}), {len(cache)} texts cached"
+                )
+
+
+if __name__ == "__main__":
+    main()
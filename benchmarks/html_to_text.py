@@ -0,0 +1,82 @@
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import readability
+from bs4 import BeautifulSoup
+
+from src.utils import html_to_text
+
+PROCESSES = 4
+
+
+def readability_html_to_text(html: str) -> str:
+    # The extraction path `html_to_text` replaced, kept here as the baseline
+    doc = readability.Document(html)
+    soup = BeautifulSoup(doc.summary(), "html.parser")
+    return soup.get_text(separator=" ", strip=True)
+
+
+def synthetic_corpus(pages: int = 40) -> list[str]:
+    paragraph = "<p>" + "The quick brown fox jumps over the lazy dog. " * 30 + "</p>"
+    boilerplate = "<li><a href='#'>Link</a></li>" * 200
+    return [
+        f"""
+        <html><head><title>Page {page}</title><script>{"var x = 1;" * 500}</script></head>
+        <body>
+            <nav><ul>{boilerplate}</ul></nav>
+            <div class="sidebar"><ul>{boilerplate}</ul></div>
+            <article><h1>Page {page}</h1>{paragraph * (20 + page * 5)}</article>
+            <footer>{boilerplate}</footer>
+        </body></html>
+        """
+        for page in range(pages)
+    ]
+
+
+def load_corpus(dir: str) -> list[str]:
+    corpus: list[str] = []
+    for path in sorted(glob.glob(os.path.join(dir, "**", "*.htm*"), recursive=True)):
+        with open(path, "r", errors="ignore") as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def timed(name: str, corpus: list[str], extract):
+    start = time.perf_counter()
+    texts = extract(corpus)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>28} | {elapsed * 1000:9.1f}ms total"
+        f" | {elapsed * 1000 / len(corpus):7.2f}ms/page"
+        f" | {sum(len(text) for text in texts) / len(corpus):9.0f} chars/page"
+    )
+
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else synthetic_corpus()
+    print(
+        f"{len(corpus)} pages, {sum(len(html) for html in corpus) / len(corpus) / 1024:.0f}KiB/page on average"
+    )
+
+    timed("readability + html.parser", corpus, lambda c: [readability_html_to_text(h) for h in c])
+    timed("lxml", corpus, lambda c: [html_to_text(h) for h in c])
+
+    with ProcessPoolExecutor(
+        max_workers=PROCESSES,
+        mp_context=multiprocessing.get_context("forkserver"),
+    ) as pool:
+        # Spin the workers up so only the extraction is measured
+        list(pool.map(html_to_text, corpus[:PROCESSES]))
+        timed(
+            f"lxml, {PROCESSES} processes",
+            corpus,
+            lambda c: list(pool.map(html_to_text, c)),
+        )
+
+
+if __name__ == "__main__":
+    main()
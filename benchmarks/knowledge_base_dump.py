@@ -0,0 +1,55 @@
+import json
+import tempfile
+import time
+import tracemalloc
+
+import chromadb
+
+from benchmarks.knowledge_base_writes import HashEmbeddingFunction
+from src.llm.tokens import estimate_tokens
+from src.vector_db.collections import CollectionCache
+from src.vector_db.knowledge_base import KnowledgeBase
+from src.vector_db.writer import BatchWriter
+
+COLLECTION = "benchmark-notes"
+
+
+def notes(count: int) -> list[str]:
+    return [f"Note #{index}: " + "something the user told me about their week. " * 10 for index in range(count)]
+
+
+def measure(dump) -> tuple[float, float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = dump()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, estimate_tokens(json.dumps(result))
+
+
+def main():
+    print(f"{'notes':>6} | {'dump':>10} | {'time':>8} | {'peak memory':>11} | {'tool result':>13}")
+    for count in [1000, 10000, 30000]:
+        with tempfile.TemporaryDirectory() as path:
+            collections = CollectionCache(
+                client=chromadb.PersistentClient(path=path), embedding_function=HashEmbeddingFunction()
+            )
+            knowledge_base = KnowledgeBase(collections=collections, writer=BatchWriter(collections=collections))
+            knowledge_base.add(COLLECTION, notes(count))
+            knowledge_base.flush()
+
+            dumps = {
+                # What `dump_knowledge_base_collection` used to do
+                "everything": lambda: knowledge_base.get(COLLECTION)["documents"],
+                "one page": lambda: knowledge_base.dump(COLLECTION, offset=count // 2).documents,
+            }
+            for name, dump in dumps.items():
+                elapsed, peak, tokens = measure(dump)
+                print(f"{count:>6} | {name:>10} | {elapsed * 1000:>6.1f}ms | {peak:>8.2f} MB | {tokens:>6} tokens")
+
+            knowledge_base.writer.close()
+
+
+if __name__ == "__main__":
+    main()
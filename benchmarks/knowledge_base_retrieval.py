@@ -0,0 +1,124 @@
+import hashlib
+import random
+import re
+import statistics
+import tempfile
+import time
+
+import chromadb
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from src.vector_db.collections import CollectionCache
+from src.vector_db.knowledge_base import KnowledgeBase
+from src.vector_db.writer import BatchWriter
+
+COLLECTION = "benchmark-tickets"
+DOCUMENTS = 3000
+QUERIES = 200
+K = 5
+
+COMPONENTS = ["login page", "billing export", "search index", "mobile app", "email digest", "report builder"]
+SYMPTOMS = ["times out", "shows a blank screen", "returns stale data", "crashes on save", "is very slow"]
+PEOPLE = ["Alice", "Bob", "Carla", "Dmitri", "Esra", "Femi"]
+
+
+class BagOfWordsEmbeddingFunction(EmbeddingFunction[Documents]):
+    # Feature-hashed words stand in for the model offline. Like a real sentence embedding it captures the
+    # topic but blurs numbers, which is where identifiers and dates get lost in dense retrieval
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings: Embeddings = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in re.findall(r"[a-z]+", text.lower()):
+                vector[int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest()) % self.dimensions] += 1
+            norm = sum(value * value for value in vector) ** 0.5 or 1.0
+            embeddings.append([value / norm for value in vector])
+        return embeddings
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-bag-of-words"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "BagOfWordsEmbeddingFunction":
+        return BagOfWordsEmbeddingFunction(**config)
+
+
+def tickets(count: int, rng: random.Random) -> list[str]:
+    return [
+        f"Ticket INC-{1000 + index}: the {rng.choice(COMPONENTS)} {rng.choice(SYMPTOMS)}, "
+        f"reported by {rng.choice(PEOPLE)} on 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        for index in range(count)
+    ]
+
+
+def information_needs(documents: list[str], count: int, rng: random.Random) -> dict[str, list[tuple[list[str], str]]]:
+    # The queries the model would send for a ticket it half remembers
+    needs: dict[str, list[tuple[list[str], str]]] = {"identifier": [], "paraphrase": [], "both": []}
+    for document in rng.sample(documents, count):
+        ticket, problem, person, date = re.match(
+            r"Ticket (INC-\d+): the (.+?), reported by (\w+) on (\S+)", document
+        ).groups()
+        needs["identifier"].append(([f"status of {ticket}"], document))
+        needs["paraphrase"].append(([f"{person} said the {problem} on {date}"], document))
+        needs["both"].append(([f"status of {ticket}", f"issue where the {problem}"], document))
+    return needs
+
+
+def dense_only(knowledge_base: KnowledgeBase, queries: list[str]) -> list[str]:
+    # What `query_knowledge_base` used to do: k nearest neighbours per query, flattened
+    results = knowledge_base.query(COLLECTION, query_texts=queries, n_results=K, include=["documents"])
+    return [document for documents in results["documents"] or [] for document in documents]
+
+
+def hybrid(knowledge_base: KnowledgeBase, queries: list[str]) -> list[str]:
+    return [result.document for result in knowledge_base.search(COLLECTION, queries, limit=K)]
+
+
+def main():
+    rng = random.Random(0)
+    documents = tickets(DOCUMENTS, rng)
+    needs = information_needs(documents, QUERIES, rng)
+
+    with tempfile.TemporaryDirectory() as path:
+        collections = CollectionCache(
+            client=chromadb.PersistentClient(path=path), embedding_function=BagOfWordsEmbeddingFunction()
+        )
+        knowledge_base = KnowledgeBase(collections=collections, writer=BatchWriter(collections=collections))
+        knowledge_base.add(COLLECTION, documents)
+        knowledge_base.flush()
+        # Build the lexical index up front, it is a one-off cost per collection
+        knowledge_base.search(COLLECTION, ["warm up"], limit=K)
+
+        print(f"{DOCUMENTS} documents, {QUERIES} information needs per kind, k={K}")
+        print(f"{'needs':>10} | {'retrieval':>10} | {'recall':>7} | {'results':>7} | {'p50':>8} | {'p95':>8}")
+        for kind, kind_needs in needs.items():
+            for retrieve in [dense_only, hybrid]:
+                hits = 0
+                returned = 0
+                latencies: list[float] = []
+                for queries, expected in kind_needs:
+                    start = time.perf_counter()
+                    results = retrieve(knowledge_base, queries)
+                    latencies.append(time.perf_counter() - start)
+                    hits += expected in results
+                    returned += len(results)
+
+                p50 = statistics.median(latencies) * 1000
+                p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+                print(
+                    f"{kind:>10} | {retrieve.__name__:>10} | {hits / len(kind_needs):>7.1%} | "
+                    f"{returned / len(kind_needs):>7.1f} | {p50:>6.2f}ms | {p95:>6.2f}ms"
+                )
+
+        knowledge_base.writer.close()
+
+
+if __name__ == "__main__":
+    main()
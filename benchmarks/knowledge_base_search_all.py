@@ -0,0 +1,78 @@
+import statistics
+import tempfile
+import time
+
+import chromadb
+from chromadb.api.types import Documents, Embeddings
+
+from benchmarks.knowledge_base_retrieval import BagOfWordsEmbeddingFunction
+from src.vector_db.collections import CollectionCache
+from src.vector_db.knowledge_base import KnowledgeBase, KnowledgeSearchResult
+from src.vector_db.writer import BatchWriter
+
+DOCUMENTS_PER_COLLECTION = 500
+EMBEDDING_SECONDS = 0.01
+RUNS = 20
+K = 10
+QUERIES = ["when is the user's birthday", "favourite programming language"]
+
+
+class SlowEmbeddingFunction(BagOfWordsEmbeddingFunction):
+    # The real model spends ~10ms per call outside the GIL, sleeping models that without downloading it
+    def __call__(self, input: Documents) -> Embeddings:
+        time.sleep(EMBEDDING_SECONDS)
+        return super().__call__(input)
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-slow-bag-of-words"
+
+
+def one_by_one(knowledge_base: KnowledgeBase) -> list[KnowledgeSearchResult]:
+    # What the model had to do before: list the collections, then query them one at a time
+    results = [
+        result
+        for name in knowledge_base.collection_names()
+        for result in knowledge_base.search(name, QUERIES, limit=K)
+    ]
+    return sorted(results, key=lambda result: result.score, reverse=True)[:K]
+
+
+def concurrently(knowledge_base: KnowledgeBase) -> list[KnowledgeSearchResult]:
+    return knowledge_base.search_all(QUERIES, limit=K)
+
+
+def latency(knowledge_base: KnowledgeBase, search) -> float:
+    search(knowledge_base)
+    timings: list[float] = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        results = search(knowledge_base)
+        timings.append(time.perf_counter() - start)
+        assert len(results) == K, len(results)
+    return statistics.median(timings)
+
+
+def main():
+    print(f"{DOCUMENTS_PER_COLLECTION} documents per collection, {EMBEDDING_SECONDS * 1000:.0f}ms per embedding call")
+    print(f"{'collections':>11} | {'one by one':>10} | {'concurrent':>10}")
+    for count in [1, 2, 4, 8, 16]:
+        with tempfile.TemporaryDirectory() as path:
+            collections = CollectionCache(
+                client=chromadb.PersistentClient(path=path), embedding_function=SlowEmbeddingFunction()
+            )
+            knowledge_base = KnowledgeBase(collections=collections, writer=BatchWriter(collections=collections))
+            for index in range(count):
+                knowledge_base.add(
+                    f"collection-{index}",
+                    [f"Note {n} in collection {index}: the user likes topic {n % 37}" for n in range(DOCUMENTS_PER_COLLECTION)],
+                )
+            knowledge_base.flush()
+
+            timings = [latency(knowledge_base, search) for search in [one_by_one, concurrently]]
+            print(f"{count:>11} | " + " | ".join(f"{timing * 1000:>8.1f}ms" for timing in timings))
+            knowledge_base.writer.close()
+
+
+if __name__ == "__main__":
+    main()
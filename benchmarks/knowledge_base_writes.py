@@ -0,0 +1,88 @@
+import hashlib
+import tempfile
+import time
+
+import chromadb
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from src.vector_db.collections import CollectionCache
+from src.vector_db.knowledge_base import KnowledgeBase
+from src.vector_db.writer import BatchWriter
+
+COLLECTION = "benchmark-facts"
+
+
+class HashEmbeddingFunction(EmbeddingFunction[Documents]):
+    # Deterministic and cheap, so the benchmark measures the knowledge base and not the model
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [
+            [byte / 255 for byte in hashlib.shake_256(text.encode()).digest(self.dimensions)]
+            for text in input
+        ]
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(**config)
+
+
+def facts(count: int) -> list[str]:
+    return [f"Fact #{index}: the user mentioned item {index % 97} on day {index}" for index in range(count)]
+
+
+def per_call_upserts(client, documents: list[str]) -> float:
+    # What `add_to_knowledge_base` used to do: resolve the collection and upsert one fact per call
+    start = time.perf_counter()
+    for index, document in enumerate(documents):
+        collection = client.get_or_create_collection(
+            COLLECTION, embedding_function=HashEmbeddingFunction()
+        )
+        collection.upsert(ids=[str(index)], documents=[document])
+    return time.perf_counter() - start
+
+
+def buffered_upserts(client, documents: list[str]) -> float:
+    collections = CollectionCache(client=client, embedding_function=HashEmbeddingFunction())
+    knowledge_base = KnowledgeBase(
+        collections=collections, writer=BatchWriter(collections=collections)
+    )
+
+    start = time.perf_counter()
+    for document in documents:
+        knowledge_base.add(COLLECTION, [document])
+
+    # Read-your-writes: the query right after the adds has to see every one of them
+    results = knowledge_base.get(COLLECTION, include=[])
+    elapsed = time.perf_counter() - start
+
+    assert len(results["ids"]) == len(documents), len(results["ids"])
+    knowledge_base.writer.close()
+    return elapsed
+
+
+def main():
+    print(f"{'facts':>6} | {'per-call upserts':>18} | {'write-behind':>18}")
+    for count in [1000, 5000]:
+        documents = facts(count)
+        timings = []
+        for benchmark in [per_call_upserts, buffered_upserts]:
+            with tempfile.TemporaryDirectory() as path:
+                timings.append(benchmark(chromadb.PersistentClient(path=path), documents))
+
+        print(
+            f"{count:>6} | "
+            + " | ".join(f"{elapsed:>6.2f}s {count / elapsed:>6.0f}/s" for elapsed in timings)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from src.llm.scheduler import ModelScheduler
+
+SWAP_SECONDS = 0.3
+REQUEST_SECONDS = 0.05
+ARRIVAL_SECONDS = 0.01
+MODELS = ["jan:v1:4b", "unsloth:qwen3:4b", "unsloth:qwen3:1.7b"]
+
+
+class FakeLlamaSwap:
+    # Serves requests in arrival order and one model at a time, swapping once the requests in flight are done
+    def __init__(self):
+        self.resident: str | None = None
+        self.running = 0
+        self.swaps = 0
+        self.tickets = 0
+        self.started = 0
+        self.condition = asyncio.Condition()
+
+    async def complete(self, model: str):
+        async with self.condition:
+            ticket = self.tickets
+            self.tickets += 1
+            await self.condition.wait_for(
+                lambda: ticket == self.started
+                and (model == self.resident or self.running == 0)
+            )
+            self.started += 1
+            self.running += 1
+            self.condition.notify_all()
+            if model != self.resident:
+                self.swaps += 1
+                self.resident = model
+                await asyncio.sleep(SWAP_SECONDS)
+
+        await asyncio.sleep(REQUEST_SECONDS)
+        async with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+
+async def workload(requests: int, *, scheduler: ModelScheduler | None) -> tuple[float, int]:
+    backend = FakeLlamaSwap()
+
+    async def request(index: int):
+        await asyncio.sleep(index * ARRIVAL_SECONDS)
+        model = MODELS[index % len(MODELS)]
+        if scheduler is None:
+            return await backend.complete(model)
+
+        async with scheduler.acquire(model) as scheduled:
+            await backend.complete(scheduled.model)
+            scheduled.on_first_token()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request(index) for index in range(requests)])
+    return time.perf_counter() - start, backend.swaps
+
+
+def main():
+    print(
+        f"Requests arrive every {ARRIVAL_SECONDS}s round-robin over {len(MODELS)} models, "
+        f"a swap takes {SWAP_SECONDS}s"
+    )
+    print(f"{'requests':>8} | {'unscheduled':>18} | {'scheduled':>18} | {'shared model':>18}")
+    for requests in [3, 12, 48]:
+        results = [
+            asyncio.run(workload(requests, scheduler=scheduler))
+            for scheduler in [
+                None,
+                ModelScheduler(aliases={}),
+                ModelScheduler(aliases={"unsloth:qwen3:1.7b": "unsloth:qwen3:4b"}),
+            ]
+        ]
+        print(
+            f"{requests:>8} | "
+            + " | ".join(f"{elapsed:>6.2f}s {swaps:>3} swaps" for elapsed, swaps in results)
+        )
+
+
+if __name__ == "__main__":
+    main()
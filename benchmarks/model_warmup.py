@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+import httpx
+import openai
+
+from src.llm.client import LLMClient
+from src.llm.history import ChatHistory
+from src.llm.scheduler import ModelScheduler
+from src.llm.warmup import ModelWarmer
+
+LOAD_SECONDS = 1.0
+MODEL = "jan:v1:4b"
+
+
+class FakeLlamaSwap:
+    def __init__(self):
+        self.resident: str | None = None
+        self.lock = asyncio.Lock()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        async with self.lock:
+            if model != self.resident:
+                await asyncio.sleep(LOAD_SECONDS)
+                self.resident = model
+
+        chunk = {
+            "id": "benchmark",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": model,
+            "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": "hi"}, "finish_reason": "stop"}
+            ],
+        }
+        return httpx.Response(
+            200,
+            content=f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode(),
+            headers={"content-type": "text/event-stream"},
+        )
+
+
+def fake_llm_client() -> LLMClient:
+    client = LLMClient().use(
+        url="http://llama-swap/v1", api_key="benchmark", scheduler=ModelScheduler(aliases={})
+    )
+    client._client = openai.AsyncOpenAI(
+        base_url="http://llama-swap/v1",
+        api_key="benchmark",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(FakeLlamaSwap().handle)),
+    )
+    return client
+
+
+def time_to_first_token(*, typing_seconds: float, warm_up: bool) -> float:
+    llm_client = fake_llm_client()
+    warmer = ModelWarmer(llm_client=llm_client)
+    if warm_up:
+        warmer.warm_up(MODEL)
+
+    time.sleep(typing_seconds)
+    warmer.cancel()
+
+    start = time.perf_counter()
+    for _ in llm_client.stream(
+        model=MODEL, chat_history=ChatHistory([{"role": "user", "content": "hello"}])
+    ):
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"Loading a model takes {LOAD_SECONDS}s")
+    print(f"{'typing':>8} | {'cold':>8} | {'warmed up':>9}")
+    for typing_seconds in [0.5, 1.5, 3.0]:
+        cold = time_to_first_token(typing_seconds=typing_seconds, warm_up=False)
+        warm = time_to_first_token(typing_seconds=typing_seconds, warm_up=True)
+        print(f"{typing_seconds:>7.1f}s | {cold:>7.2f}s | {warm:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
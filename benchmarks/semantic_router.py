@@ -0,0 +1,83 @@
+import json
+import time
+
+from src.constants import ROUTER_LLM, SEMANTIC_ROUTER_SYSTEM_PROMPT
+from src.llm.client import llm_client
+from src.llm.history import ChatHistory
+from src.llm.router import semantic_router
+from src.llm.utils import SemanticRouterTarget
+
+LABELLED_PROMPTS: list[tuple[str, SemanticRouterTarget]] = [
+    ("hey, what's up?", "conversational"),
+    ("nice to meet you, I'm Andrei", "conversational"),
+    ("can you remember that I like green tea?", "conversational"),
+    ("haha, that's funny", "conversational"),
+    ("what's your favourite colour?", "conversational"),
+    ("goodbye, talk to you later", "conversational"),
+    ("search the web for the population of Japan", "search"),
+    ("who wrote the lord of the rings?", "search"),
+    ("find the changelog for numpy 2.0", "search"),
+    ("what is the capital of Australia?", "search"),
+    ("look up reviews for the framework laptop", "search"),
+    ("what do I have stored about my projects?", "search"),
+    ("show me the contents of my downloads folder", "agentic"),
+    ("move all pdf files from downloads into documents", "agentic"),
+    ("open a terminal and run htop", "agentic"),
+    ("build me an agent that resizes images", "agentic"),
+    ("multiply 17 by 42", "agentic"),
+    ("kill the process listening on port 8080", "agentic"),
+]
+
+
+def llm_route(prompt: str) -> str | None:
+    from src.llm.tools import categorize_prompt
+
+    response = llm_client.stream(
+        model=ROUTER_LLM,
+        chat_history=ChatHistory(
+            [{"role": "system", "content": SEMANTIC_ROUTER_SYSTEM_PROMPT()}]
+        ).add_user_message(prompt),
+        tools=[categorize_prompt.spec],
+    ).process(on_generation_finish=lambda: None)
+
+    for tool_call in response.tool_calls or []:
+        return json.loads(tool_call.function.arguments).get("category")  # pyright: ignore
+    return None
+
+
+def report(name: str, route):
+    correct = 0
+    latencies: list[float] = []
+    for prompt, expected in LABELLED_PROMPTS:
+        start = time.perf_counter()
+        category = route(prompt)
+        latencies.append(time.perf_counter() - start)
+        correct += category == expected
+
+    latencies.sort()
+    print(
+        f"{name:>16} | accuracy {correct}/{len(LABELLED_PROMPTS)}"
+        f" | p50 {latencies[len(latencies) // 2] * 1000:8.1f}ms"
+        f" | max {latencies[-1] * 1000:8.1f}ms"
+    )
+
+
+def main():
+    # Embedding the exemplars is a one-off cost, keep it out of the per-prompt latency
+    semantic_router.classify(["warm up"])
+
+    report("embeddings", lambda prompt: semantic_router.classify([prompt])[0].category)
+
+    def hybrid_route(prompt: str):
+        decision = semantic_router.route(prompt)
+        return decision.category if decision is not None else llm_route(prompt)
+
+    try:
+        report("llm", llm_route)
+        report("embeddings + llm", hybrid_route)
+    except Exception as e:
+        print(f"Skipping the LLM router, `{ROUTER_LLM}` is unreachable: {e}")
+
+
+if __name__ == "__main__":
+    main()
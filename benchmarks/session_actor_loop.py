@@ -0,0 +1,89 @@
+import time
+from typing import Literal
+
+from openai.types.chat import ParsedChatCompletionMessage
+
+from src.llm.history import ChatHistory
+from src.llm.session.actor.actor import Actor
+from src.llm.session.actor.assistant import AssistantActor
+from src.llm.session.actor.system import SystemActor
+from src.llm.session.actor.tool import ToolActor
+from src.llm.session.session import Session
+from src.utils import distinct_by
+
+
+class ListScanSession(Session):
+    # The previous actor loop: rescans the actors and a `processed` list on every step
+    def run(self):
+        self.ops.round.on_start(static_actors=self.static_actors)
+        self.state.actors = distinct_by(
+            lambda actor: actor.id,
+            self.static_actors
+            + self.state.injected_system_actors
+            + self.state.injected_tool_actors
+            + self.state.injected_assistant_actors
+        )
+        processed: list[str] = []
+
+        while True:
+            actor: Actor | Literal["end-round"] | None = None
+            for _actor in self.state.actors:
+                if _actor == "end-round" or _actor.id not in processed:
+                    actor = _actor
+                    break
+
+            if actor == "end-round":
+                break
+
+            if actor is not None:
+                self.act(actor)
+                processed.append(actor.id)
+
+            if len(self.state.actors) > 0 and len(processed) == len(self.state.actors):
+                self.act(self.main_assistant_actor)
+
+        self.ops.round.on_end()
+
+
+def round_latency(session_class: type[Session], *, actors: int) -> float:
+    def response_factory(_: ChatHistory):
+        return ParsedChatCompletionMessage[None](role="assistant", content="done")
+
+    session = session_class(
+        looped=False,
+        static_actors=[SystemActor.with_message("benchmark")],
+        main_assistant_actor=AssistantActor.with_stream(response_factory=response_factory),
+    )
+    # Keep the knowledge base out of the measurement
+    session.state.chat_history_persistence = None
+    for index in range(actors):
+        session.ops.injection.inject_tool(
+            ToolActor.injected(tool="benchmark", result=index)
+        )
+
+    start = time.perf_counter()
+    session.start()
+    elapsed = time.perf_counter() - start
+
+    history = session.state.chat_histories[-1]
+    assert len(history) == actors + 2, len(history)
+    assert history[-1]["content"] == "done"
+
+    return elapsed
+
+
+def main():
+    print(f"{'actors':>6} | {'list scan':>10} | {'run queue':>10}")
+    for actors in [250, 500, 1000, 2000, 4000, 8000]:
+        # The list scan is O(n^3) over a round, only time it where it finishes in reasonable time
+        list_scan = (
+            f"{round_latency(ListScanSession, actors=actors):>9.3f}s"
+            if actors <= 1000
+            else f"{'-':>10}"
+        )
+        run_queue = round_latency(Session, actors=actors)
+        print(f"{actors:>6} | {list_scan} | {run_queue:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import re
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+# Regression budget for `import main`, most of it is openai's eagerly imported types
+STARTUP_IMPORT_BUDGET_SECONDS = 1.0
+# Only needed once a prompt actually touches the knowledge base or the web
+DEFERRED_MODULES = ["chromadb", "lxml"]
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times() -> dict[str, tuple[int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is not None:
+            self_us, cumulative_us, _, module = match.groups()
+            times[module] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    runs = [import_times() for _ in range(RUNS)]
+    total = statistics.median(times["main"][1] for times in runs) / 1e6
+
+    print(f"`import main` takes {total:.3f}s (median of {RUNS}, budget {STARTUP_IMPORT_BUDGET_SECONDS:.3f}s)")
+    print("Heaviest top-level packages:")
+    packages: dict[str, int] = {}
+    for module, (self_us, _) in runs[-1].items():
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    for package, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:10]:
+        print(f"  {package:<24} {self_us / 1e6:.3f}s")
+
+    failures: list[str] = []
+    if total > STARTUP_IMPORT_BUDGET_SECONDS:
+        failures.append(f"startup took {total:.3f}s, over the {STARTUP_IMPORT_BUDGET_SECONDS:.3f}s budget")
+
+    eager = [module for module in DEFERRED_MODULES if module in runs[-1]]
+    if len(eager) > 0:
+        failures.append(f"imported at startup but should be deferred: {', '.join(eager)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if len(failures) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
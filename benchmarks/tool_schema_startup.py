@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+from textwrap import dedent
+
+from src.llm import evolution
+from src.llm.evolution import ToolSchemaCache, get_tools_from
+
+AGENTS = 50
+TOOLS_PER_AGENT = 5
+
+
+def write_agents(dir: str):
+    for agent in range(AGENTS):
+        with open(os.path.join(dir, f"agent_{agent}.py"), "w") as f:
+            f.write("from src.llm.evolution import tool\n")
+            for index in range(TOOLS_PER_AGENT):
+                f.write(
+                    dedent(f"""
+                    @tool
+                    def agent_{agent}__tool_{index}(numbers: list[int], label: str | None = None) -> int:
+                        \"\"\"Tool number {index} of agent {agent}
+                        Args:
+                            numbers (list[int]): The numbers to work on
+                            label (str): An optional label
+                        Returns:
+                            int: The result
+                        \"\"\"
+                        return sum(numbers)
+                    """)
+                )
+
+
+def load_agents(dir: str) -> float:
+    evolution.loaded_tool_modules.clear()
+
+    start = time.perf_counter()
+    for agent in range(AGENTS):
+        get_tools_from(dir=dir, module_name=f"agent_{agent}", evolved=True)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as dir:
+        write_agents(dir)
+        cache_path = os.path.join(dir, "cache", "tool_schemas.json")
+
+        evolution.tool_schema_cache = ToolSchemaCache(path=cache_path)
+        cold = load_agents(dir)
+        evolution.tool_schema_cache.save()
+
+        # A fresh cache instance has to go through the file on disk, like a new process would
+        evolution.tool_schema_cache = ToolSchemaCache(path=cache_path)
+        warm = load_agents(dir)
+
+        print(f"{AGENTS} agents x {TOOLS_PER_AGENT} tools")
+        print(f"cold start (no schema cache): {cold * 1000:.1f}ms")
+        print(f"warm start (on-disk cache):   {warm * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm.tools import search_for_information_on_the_web
+from src.web.cache import WebCache
+from src.web.client import web_client
+
+PAGE_SECONDS = 0.2
+# Pages are spread over loopback addresses, so the per-host connection limit doesn't serialize them
+HOSTS = [f"127.0.0.{index}" for index in range(1, 9)]
+
+
+class FakeSearxngAndWeb(BaseHTTPRequestHandler):
+    # One local server plays both SearXNG and the sites it links to
+    pages = 8
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        port = self.server.server_address[1]
+        if url.path == "/search":
+            query = urllib.parse.parse_qs(url.query)["q"][0]
+            results = [
+                {"url": f"http://{HOSTS[index % len(HOSTS)]}:{port}/page/{query}/{index}", "title": f"Page {index}"}
+                for index in range(self.pages)
+            ]
+            # Broken or empty results that must only cost their own page
+            results[1:1] = [
+                {"title": "No url"},
+                {"url": "http://[not-a-url", "title": "Malformed url"},
+                {"url": f"http://127.0.0.1:{port}/missing", "title": "Not found"},
+                {"url": f"http://127.0.0.1:{port}/empty", "title": "Rendered by script"},
+            ]
+            return self.respond(200, "application/json", json.dumps({"results": results}))
+
+        if url.path.startswith("/page/"):
+            time.sleep(PAGE_SECONDS)
+            index = url.path.rsplit("/", 1)[-1]
+            return self.respond(
+                200,
+                "text/html",
+                f"<html><body><article><h1>Page {index}</h1><p>Content of page {index}.</p></article></body></html>",
+            )
+
+        if url.path == "/empty":
+            return self.respond(200, "text/html", "<html><body><script>render()</script></body></html>")
+
+        self.respond(404, "text/plain", "not found")
+
+    def respond(self, status: int, content_type: str, body: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format: str, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("0.0.0.0", 0), FakeSearxngAndWeb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    web_client.searxng_endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    web_client.cache = WebCache(path=os.path.join(tempfile.mkdtemp(), "web.sqlite3"))
+
+    print(f"Each page takes {PAGE_SECONDS}s to serve, 4 broken results mixed in")
+    print(f"{'pages':>5} | {'returned':>8} | {'cold':>7} | {'cached':>7}")
+    for pages in [1, 4, 8, 16]:
+        FakeSearxngAndWeb.pages = pages
+        timings: list[float] = []
+        for _ in range(2):
+            start = time.perf_counter()
+            results = search_for_information_on_the_web.invoke(
+                query=f"benchmark-{pages}", should_summarize=False, max_results=pages
+            )
+            timings.append(time.perf_counter() - start)
+            assert sorted(result["title"] for result in results) == sorted(
+                f"Page {index}" for index in range(pages)
+            ), results
+
+        print(f"{pages:>5} | {len(results):>8} | " + " | ".join(f"{timing:>6.2f}s" for timing in timings))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,12 @@ from src.llm.spawner.tool import create_tool_actor_spawner
 from src.llm.session.session import InteractiveSession
 from src.llm.evolution import get_tools_from
 from src.llm.utils import LLMGenerationConfig
-from src.constants import ROUTER_LLM, PRIMITIVE_TOOLS_DIR, SEMANTIC_ROUTER_SYSTEM_PROMPT
+from src.constants import (
+    MAX_CONCURRENT_TOOL_CALLS,
+    ROUTER_LLM,
+    PRIMITIVE_TOOLS_DIR,
+    SEMANTIC_ROUTER_SYSTEM_PROMPT,
+)
 from src.llm.client import llm_client
 from src.llm.pipeline import SeaConfig, SeaPipeline
 
@@ -34,11 +39,15 @@ def main():
             ),
         ),
         tool_actor_spawner=create_tool_actor_spawner(),
+        max_concurrent_tool_calls=MAX_CONCURRENT_TOOL_CALLS,
     )
     sea_config = SeaConfig(llm_client=llm_client, session=session)
     pipeline = SeaPipeline(config=sea_config)
     pipeline = pipeline.with_semantic_router(config=llm_generation_config)
     pipeline = pipeline.with_short_term_memory_summary()
+    pipeline = pipeline.with_model_swap_report()
+    pipeline = pipeline.with_embedding_cache_report()
+    pipeline = pipeline.with_model_warm_up()
     pipeline.run()
 
 
@@ -1,22 +1,160 @@
 import os
 from textwrap import dedent
 
-from src.llm.utils import SEMANTIC_ROUTER_TARGETS
+from src.llm.utils import (
+    SEMANTIC_ROUTER_TARGETS,
+    ContextTrimPolicy,
+    PromptLayout,
+    SemanticRouterTarget,
+)
 
 LLM_BACKEND_ENDPOINT = "http://localhost:8080/v1"
+LLM_BACKEND_MAX_CONNECTIONS = 16
+LLM_BACKEND_MAX_KEEPALIVE_CONNECTIONS = 8
+# llama-swap proxies anything under /upstream/<model>/ straight to that model's llama-server
+LLM_BACKEND_TOKENIZE_ENDPOINT = "http://localhost:8080/upstream/{model}/tokenize"
+LLM_BACKEND_TOKENIZE_TIMEOUT_SECONDS = 2
+LLM_BACKEND_TOKENIZE_RETRY_SECONDS = 60
+LLM_BACKEND_CACHE_PROMPT = True
+# Pins a model's requests to one llama-server slot (`id_slot`), otherwise the server picks the most similar one
+LLM_BACKEND_SLOTS: dict[str, int] = {}
+LLM_PROMPT_LAYOUT: PromptLayout = "stable-prefix"
+LLM_WARM_UP_PROMPT = "hi"
 ROUTER_LLM = "jan:v1:4b"
 GENERALIST_LLM = "unsloth:qwen3:4b"
 AGENT_LLM = "unsloth:qwen3:4b"
 # SUMMARIZER_LLM = "unsloth:qwen3:0.6b"
 SUMMARIZER_LLM = "unsloth:qwen3:1.7b"
+SEMANTIC_ROUTER_TARGET_LLMS: dict[SemanticRouterTarget, str] = {
+    "conversational": GENERALIST_LLM,
+    "search": GENERALIST_LLM,
+    "agentic": GENERALIST_LLM,
+}
+# Serve a role with another role's model to save llama-swap swaps, e.g. {SUMMARIZER_LLM: GENERALIST_LLM}
+LLM_MODEL_ALIASES: dict[str, str] = {}
+
+# Mirrors the `--ctx_size` flags in llama-swap.config.yaml
+LLM_CONTEXT_SIZES: dict[str, int] = {
+    "unsloth:qwen3:1.7b": 8192,
+    "unsloth:qwen3:4b": 16384,
+    "jan:v1:4b": 32768,
+}
+LLM_DEFAULT_CONTEXT_SIZE = 4096
+LLM_MAX_COMPLETION_TOKENS = 2048
 
 SEARXNG_ENDPOINT = "http://localhost:8081"
 
+APPROXIMATE_CHARS_PER_TOKEN = 3.5
+TOKEN_COUNT_CACHE_CAPACITY = 8192
+
+# Chat template tokens (role markers, separators) that the content alone doesn't account for
+CONTEXT_MESSAGE_OVERHEAD_TOKENS = 8
+CONTEXT_SAFETY_MARGIN_TOKENS = 128
+CONTEXT_COMPACT_MESSAGE_TOKENS = 512
+CONTEXT_TRIM_POLICIES: list[ContextTrimPolicy] = ["compact", "drop"]
+
+# Chunks have to fit the summarizer's `--ctx_size` (see llama-swap.config.yaml) along with the prompt and the response
+SUMMARIZER_CHUNK_TOKENS = 4096
+SUMMARIZER_FAN_OUT = 4
+SUMMARIZER_MAX_CONCURRENCY = 4
+SUMMARIZER_CACHE_CAPACITY = 4096
+
+WEB_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+WEB_REQUEST_TIMEOUT_SECONDS = 10
+WEB_SEARCH_DEADLINE_SECONDS = 30
+WEB_MAX_CONNECTIONS = 32
+WEB_MAX_CONNECTIONS_PER_HOST = 2
+WEB_CACHE_TTL_SECONDS = 24 * 60 * 60
+HTML_TO_TEXT_MAX_INPUT_BYTES = 2 * 1024 * 1024
+HTML_TO_TEXT_MAX_OUTPUT_CHARS = 32_000
+# Bump when `html_to_text` changes what it extracts, so cached page text is extracted again
+HTML_TO_TEXT_VERSION = 2
+# Extraction is capped, so a process pool only pays off for large batches of big pages
+HTML_TO_TEXT_PROCESSES = 0
+WEB_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD = 0.5
+ROUTING_CACHE_CAPACITY = 512
+ROUTING_CACHE_SIMILARITY_THRESHOLD = 0.92
+# Texts, not bytes: ~50MB of vectors with the default 384-dimension model
+EMBEDDING_CACHE_CAPACITY = 32768
+SEMANTIC_ROUTER_EXEMPLARS: dict[SemanticRouterTarget, list[str]] = {
+    "conversational": [
+        "hi",
+        "hello there, how are you?",
+        "good morning!",
+        "thanks, that was helpful",
+        "what's my name?",
+        "remember that my birthday is on the 3rd of May",
+        "do you remember what we talked about yesterday?",
+        "tell me a joke",
+        "how was your day?",
+        "I'm feeling a bit tired today",
+    ],
+    "search": [
+        "search the web for the latest python release",
+        "look up who won the world cup in 2018",
+        "find information about the james webb telescope",
+        "what's the weather like in Berlin today?",
+        "why is the sky blue?",
+        "what did I save in my knowledge base about rust?",
+        "find me the documentation for httpx timeouts",
+        "who is the current president of France?",
+        "search for recent news about llama.cpp",
+        "look for articles comparing postgres and mysql",
+    ],
+    "agentic": [
+        "list the files in my home directory",
+        "open firefox",
+        "create a new folder called projects on my desktop",
+        "write a script that renames all the images in this folder",
+        "calculate the sum of 123 and 456",
+        "delete the temporary files in /tmp",
+        "run the tests in this repository",
+        "take a screenshot of my screen",
+        "create an agent that converts csv files to json",
+        "check how much disk space is left",
+    ],
+}
+
+# Only tools marked `read_only` run concurrently, anything with side effects keeps the order the model asked for
+MAX_CONCURRENT_TOOL_CALLS = 4
+INJECTION_PRECOMPUTE_WORKERS = 2
+
 PRIMITIVE_TOOLS_DIR = os.path.join(os.curdir, "src", "llm")
 
 EVOLUTION_DIR = os.path.join(os.curdir, "__evolution")
 EVOLVED_AGENT_DIR = os.path.join(EVOLUTION_DIR, "agents")
 EVOLVED_KNOWLEDGE_BASE_DIR = os.path.join(EVOLUTION_DIR, "knowledge_base")
+CACHE_DIR = os.path.join(EVOLUTION_DIR, "cache")
+TOOL_SCHEMA_CACHE_PATH = os.path.join(CACHE_DIR, "tool_schemas.json")
+ROUTING_CACHE_PATH = os.path.join(CACHE_DIR, "routing_decisions.json")
+WEB_CACHE_PATH = os.path.join(CACHE_DIR, "web.sqlite3")
+SUMMARY_CACHE_PATH = os.path.join(CACHE_DIR, "summaries.json")
+EMBEDDING_CACHE_DIR = os.path.join(CACHE_DIR, "embeddings")
+
+KNOWLEDGE_BASE_WRITE_BATCH_SIZE = 64
+KNOWLEDGE_BASE_WRITE_BUFFER_SIZE = 256
+# Below chroma's max batch size for its default SQLite settings
+KNOWLEDGE_BASE_MAX_UPSERT_SIZE = 4096
+# Candidates each ranking (dense and lexical, per query) contributes to the fusion
+KNOWLEDGE_BASE_SEARCH_CANDIDATES = 50
+RECIPROCAL_RANK_FUSION_K = 60
+KNOWLEDGE_BASE_SEARCH_WORKERS = 8
+# Each lexical index holds its collection's documents in memory, the least recently searched go first
+KNOWLEDGE_BASE_LEXICAL_INDEX_CAPACITY = 16
+# Every session writes its own chat history collection, searching across collections skips them by default
+CHAT_HISTORY_COLLECTION_PREFIX = "chat-history__"
+# Each session's rolling summary, keyed by its chat history collection
+CHAT_HISTORY_SUMMARY_COLLECTION = f"{CHAT_HISTORY_COLLECTION_PREFIX}summaries"
+# A dumped page stops at whichever of these it reaches first, so a big collection never floods the context
+KNOWLEDGE_BASE_DUMP_PAGE_SIZE = 50
+KNOWLEDGE_BASE_DUMP_PAGE_BYTES = 16 * 1024
+KNOWLEDGE_BASE_DUMP_PAGE_TOKENS = 2048
+KNOWLEDGE_BASE_READ_BATCH_SIZE = 256
+KNOWLEDGE_BASE_TRUNCATION_MARKER = " [truncated]"
+BM25_K1 = 1.5
+BM25_B = 0.75
 
 AGENTIC_SYSTEM_PROMPT = lambda: dedent(f"""
     You are the agentic version of SEA, a self-evolving large language model.
@@ -128,6 +266,18 @@ SUMMARIZER_SYSTEM_PROMPT = lambda text: dedent(f"""
     {text}
 """)
 
+SUMMARIZER_MERGE_SYSTEM_PROMPT = lambda summaries: dedent(f"""
+    You are the `summarizer` agent.
+    You only exist to summarize text so that it's easy to comprehend in a concise form.
+
+    You are given partial summaries of consecutive sections of the same text.
+    Merge them into a single summary, in the order they are given, so that it is easy to infer what the whole text was about,
+    but also short enough to fit in a handful paragraphs of text.
+
+    The partial summaries are:
+    {summaries}
+""")
+
 DISPATCHED_AGENT_PROMPT = lambda agent_to_dispatch, original_request, context: dedent(f"""
     You are the `{agent_to_dispatch}`.
     You are tasked to take care of the following request from the user: `{original_request}`.
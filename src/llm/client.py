@@ -1,19 +1,74 @@
-from typing import Callable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Coroutine, Iterable, TypeVar
 
+import httpx
 import openai
 from openai.types.chat import ChatCompletionToolUnionParam, ParsedChatCompletionMessage
 from openai.types.shared.chat_model import ChatModel
 
-from src.constants import LLM_BACKEND_ENDPOINT
+from src.constants import (
+    LLM_BACKEND_CACHE_PROMPT,
+    LLM_BACKEND_ENDPOINT,
+    LLM_BACKEND_MAX_CONNECTIONS,
+    LLM_BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_BACKEND_SLOTS,
+    LLM_MAX_COMPLETION_TOKENS,
+    LLM_PROMPT_LAYOUT,
+)
+from src.llm.context import ContextFitReport, ContextWindow
 from src.llm.history import ChatHistory
-from src.utils import StatefulGenerator
+from src.llm.layout import stable_prompt_layout
+from src.llm.scheduler import ModelScheduler
+from src.llm.utils import PromptLayout
+from src.utils import BackgroundEventLoop, StatefulGenerator
 
+T = TypeVar("T")
 
-class Stream(
-    StatefulGenerator[
-        tuple[str, None] | tuple[None, str], ParsedChatCompletionMessage[None]
-    ]
-):
+StreamToken = tuple[str, None] | tuple[None, str]
+
+
+@dataclass
+class PromptCacheReport:
+    cached_tokens: int
+    evaluated_tokens: int
+
+    @property
+    def reuse(self) -> float:
+        total = self.cached_tokens + self.evaluated_tokens
+        return self.cached_tokens / total if total else 0.0
+
+
+class AsyncStream:
+    def __init__(self, g: Callable[["AsyncStream"], AsyncGenerator[StreamToken, None]]):
+        self.g = g
+        self.ret: ParsedChatCompletionMessage[None] = None  # pyright: ignore
+        self.context_report: ContextFitReport | None = None
+        self.prompt_cache_report: PromptCacheReport | None = None
+
+    def __aiter__(self):
+        return self.g(self)
+
+    async def process(
+        self,
+        *,
+        on_content_token: Callable[[str], None] = lambda _: None,
+        on_tool_call_token: Callable[[str], None] = lambda _: None,
+        on_generation_finish: Callable[[], None],
+    ) -> ParsedChatCompletionMessage[None]:
+        async for content_token, tool_call_token in self:
+            if content_token:
+                on_content_token(content_token)
+            if tool_call_token:
+                on_tool_call_token(tool_call_token)
+
+        llm_response = self.ret
+        on_generation_finish()
+
+        return llm_response
+
+
+class Stream(StatefulGenerator[StreamToken, ParsedChatCompletionMessage[None]]):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -37,53 +92,205 @@ class Stream(
 
 
 class LLMClient:
-    _client: openai.OpenAI = None  # pyright: ignore
+    _client: openai.AsyncOpenAI = None  # pyright: ignore
+    _event_loop: BackgroundEventLoop = None  # pyright: ignore
+    context_window: ContextWindow | None = None
+    prompt_layout: PromptLayout = "as-is"
+    cache_prompt: bool = False
+    slots: dict[str, int] = {}
+    scheduler: ModelScheduler = None  # pyright: ignore
 
-    def use(self, *, url: str, api_key: str | None = None):
-        self._client = openai.OpenAI(base_url=url, api_key=api_key or "")
+    def use(
+        self,
+        *,
+        url: str,
+        api_key: str | None = None,
+        max_connections: int = LLM_BACKEND_MAX_CONNECTIONS,
+        max_keepalive_connections: int = LLM_BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+        context_window: ContextWindow | None = None,
+        prompt_layout: PromptLayout = "as-is",
+        cache_prompt: bool = False,
+        slots: dict[str, int] | None = None,
+        scheduler: ModelScheduler | None = None,
+    ):
+        self.scheduler = scheduler or ModelScheduler(aliases={})
+        self.context_window = context_window
+        if context_window is not None and context_window.counter.scheduler is None:
+            context_window.counter.scheduler = self.scheduler
+        self.prompt_layout = prompt_layout
+        self.cache_prompt = cache_prompt
+        self.slots = slots or {}
+        self._event_loop = BackgroundEventLoop(name="sea-llm-client")
+        self._client = openai.AsyncOpenAI(
+            base_url=url,
+            api_key=api_key or "",
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                ),
+            ),
+        )
         return self
 
-    def get(self) -> openai.OpenAI:
+    def get(self) -> openai.AsyncOpenAI:
         return self._client
 
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        # Every caller shares one background loop, and with it the connection pool
+        return self._event_loop.submit(coro)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.submit(coro).result()
+
+    def astream(
+        self,
+        *,
+        model: ChatModel | str,
+        chat_history: ChatHistory,
+        tools: Iterable[ChatCompletionToolUnionParam] = [],
+        max_tokens: int = LLM_MAX_COMPLETION_TOKENS,
+    ) -> AsyncStream:
+        messages = list(chat_history)
+        tools = list(tools)
+
+        async def gen(stream: AsyncStream):
+            nonlocal messages
+            # Fitting may summarize, and the summarizer waits for its own turn on the scheduler, so it has
+            # to happen before this request holds one. Tokenizing takes its turn through the counter
+            if self.context_window is not None:
+                resolved_model = self.scheduler.resolve(model)
+                messages, stream.context_report = await self.context_window.fit(
+                    messages, model=resolved_model, max_tokens=max_tokens, tools=tools
+                )
+                report = stream.context_report
+                if report.tokens_trimmed > 0:
+                    print(
+                        f"[CONTEXT] [{resolved_model}] Trimmed ~{report.tokens_trimmed} tokens "
+                        f"({report.tokens_before} -> {report.tokens_after}, budget {report.budget}; "
+                        f"compacted {report.compacted}, summarized {report.summarized}, dropped {report.dropped}, "
+                        f"clipped {report.clipped} messages)"
+                    )
+                if report.tokens_after > report.budget:
+                    print(
+                        f"[CONTEXT] [{resolved_model}] Still over budget after trimming: "
+                        f"{report.tokens_after} > {report.budget}"
+                    )
+
+            async with self.scheduler.acquire(model) as request:
+                request_tools = tools
+                if self.prompt_layout == "stable-prefix":
+                    messages, request_tools = stable_prompt_layout(messages, tools)
+
+                # llama.cpp specific, other OpenAI compatible backends ignore unknown fields
+                extra_body: dict[str, Any] = {"cache_prompt": self.cache_prompt}
+                if request.model in self.slots:
+                    extra_body["id_slot"] = self.slots[request.model]
+
+                timings: dict[str, Any] | None = None
+                async with self._client.chat.completions.stream(
+                    model=request.model,
+                    messages=messages,  # pyright: ignore
+                    tools=request_tools,
+                    temperature=0.6,
+                    top_p=0.95,
+                    max_tokens=max_tokens,
+                    extra_body=extra_body,
+                ) as completion_stream:
+                    async for event in completion_stream:
+                        if event.type == "chunk":
+                            timings = (event.chunk.model_extra or {}).get("timings") or timings
+                            content = event.chunk.choices[0].delta.content
+                            if content:
+                                request.on_first_token()
+                                yield content, None
+
+                            tool_calls = event.chunk.choices[0].delta.tool_calls
+                            if tool_calls:
+                                request.on_first_token()
+                                for tool_call in tool_calls:
+                                    if tool_call.function is not None:
+                                        if tool_call.function.name is not None:
+                                            yield (
+                                                None,
+                                                f"Executing tool call: {tool_call.function.name} ",
+                                            )
+                                        if tool_call.function.arguments is not None:
+                                            yield None, tool_call.function.arguments
+
+                    completion = await completion_stream.get_final_completion()
+                    stream.ret = completion.choices[0].message
+                    request.on_first_token()
+
+                stream.prompt_cache_report = self.prompt_cache_report(timings, completion)
+                if stream.prompt_cache_report is not None:
+                    cache_report = stream.prompt_cache_report
+                    print(
+                        f"[PROMPT CACHE] [{request.model}] {cache_report.cached_tokens} cached, "
+                        f"{cache_report.evaluated_tokens} evaluated prompt tokens ({cache_report.reuse:.0%} reused)"
+                    )
+
+        return AsyncStream(gen)
+
+    @staticmethod
+    def prompt_cache_report(
+        timings: dict[str, Any] | None, completion: Any
+    ) -> PromptCacheReport | None:
+        # llama-server reports `cache_n`/`prompt_n` in the timings of the last chunk
+        if timings is not None and "prompt_n" in timings:
+            return PromptCacheReport(
+                cached_tokens=timings.get("cache_n", 0),
+                evaluated_tokens=timings["prompt_n"],
+            )
+
+        usage = getattr(completion, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        if usage is None or details is None or details.cached_tokens is None:
+            return None
+
+        return PromptCacheReport(
+            cached_tokens=details.cached_tokens,
+            evaluated_tokens=usage.prompt_tokens - details.cached_tokens,
+        )
+
     def stream(
         self,
         *,
         model: ChatModel | str,
         chat_history: ChatHistory,
         tools: Iterable[ChatCompletionToolUnionParam] = [],
-    ):
-        def gen(chat_history: ChatHistory):
-            with self._client.chat.completions.stream(
-                model=model,
-                messages=chat_history,  # pyright: ignore
-                tools=tools,
-                temperature=0.6,
-                top_p=0.95,
-                max_tokens=2048,
-            ) as stream:
-                for event in stream:
-                    if event.type == "chunk":
-                        content = event.chunk.choices[0].delta.content
-                        if content:
-                            yield content, None
-
-                        tool_calls = event.chunk.choices[0].delta.tool_calls
-                        if tool_calls:
-                            for tool_call in tool_calls:
-                                if tool_call.function is not None:
-                                    if tool_call.function.name is not None:
-                                        yield (
-                                            None,
-                                            f"Executing tool call: {tool_call.function.name} ",
-                                        )
-                                    if tool_call.function.arguments is not None:
-                                        yield None, tool_call.function.arguments
-
-                completion = stream.get_final_completion()
-                return completion.choices[0].message
-
-        return Stream(gen(chat_history))
-
-
-llm_client = LLMClient().use(url=LLM_BACKEND_ENDPOINT, api_key="placeholder")
+        max_tokens: int = LLM_MAX_COMPLETION_TOKENS,
+    ) -> Stream:
+        astream = self.astream(
+            model=model, chat_history=chat_history, tools=tools, max_tokens=max_tokens
+        )
+
+        def gen():
+            tokens = astream.__aiter__()
+
+            async def next_token():
+                return await anext(tokens)
+
+            # A consumer that stops early would leave the request suspended on the loop, holding its
+            # scheduler slot
+            try:
+                while True:
+                    try:
+                        yield self.run(next_token())
+                    except StopAsyncIteration:
+                        return astream.ret
+            finally:
+                self.run(tokens.aclose())
+
+        return Stream(gen())
+
+
+llm_client = LLMClient().use(
+    url=LLM_BACKEND_ENDPOINT,
+    api_key="placeholder",
+    context_window=ContextWindow(),
+    prompt_layout=LLM_PROMPT_LAYOUT,
+    cache_prompt=LLM_BACKEND_CACHE_PROMPT,
+    slots=LLM_BACKEND_SLOTS,
+    scheduler=ModelScheduler(),
+)
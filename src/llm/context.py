@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from src.constants import (
+    APPROXIMATE_CHARS_PER_TOKEN,
+    CONTEXT_COMPACT_MESSAGE_TOKENS,
+    CONTEXT_MESSAGE_OVERHEAD_TOKENS,
+    CONTEXT_SAFETY_MARGIN_TOKENS,
+    CONTEXT_TRIM_POLICIES,
+    LLM_BACKEND_TOKENIZE_ENDPOINT,
+    LLM_BACKEND_TOKENIZE_RETRY_SECONDS,
+    LLM_BACKEND_TOKENIZE_TIMEOUT_SECONDS,
+    LLM_CONTEXT_SIZES,
+    LLM_DEFAULT_CONTEXT_SIZE,
+    TOKEN_COUNT_CACHE_CAPACITY,
+)
+from src.llm.history import ChatHistory
+from src.llm.scheduler import ModelScheduler
+from src.llm.tokens import estimate_tokens
+from src.llm.utils import ContextTrimPolicy
+
+
+def message_text(message: dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    if message.get("tool_calls"):
+        text += json.dumps(message["tool_calls"], default=str)
+    return text
+
+
+@dataclass
+class TokenCounter:
+    endpoint: str = field(default=LLM_BACKEND_TOKENIZE_ENDPOINT)
+    timeout: float = field(default=LLM_BACKEND_TOKENIZE_TIMEOUT_SECONDS)
+    retry_after: float = field(default=LLM_BACKEND_TOKENIZE_RETRY_SECONDS)
+    capacity: int = field(default=TOKEN_COUNT_CACHE_CAPACITY)
+    # Tokenizing makes llama-swap load the model like any other request, so it waits for its turn too
+    scheduler: ModelScheduler | None = field(default=None)
+
+    def __post_init__(self):
+        self.cache: OrderedDict[str, int] = OrderedDict()
+        self.unavailable_until: dict[str, float] = {}
+        self.client: httpx.AsyncClient | None = None
+
+    async def tokenize(self, text: str, *, model: str) -> int | None:
+        if time.monotonic() < self.unavailable_until.get(model, 0):
+            return None
+
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+
+        try:
+            if self.scheduler is None:
+                response = await self.client.post(
+                    self.endpoint.format(model=model), json={"content": text}
+                )
+            else:
+                async with self.scheduler.acquire(model) as request:
+                    response = await self.client.post(
+                        self.endpoint.format(model=model), json={"content": text}
+                    )
+                    request.on_first_token()
+            response.raise_for_status()
+            return len(response.json()["tokens"])
+        except (httpx.HTTPError, KeyError, ValueError):
+            # Don't pay for a failing round trip on every message
+            self.unavailable_until[model] = time.monotonic() + self.retry_after
+            return None
+
+    async def count(self, text: str, *, model: str) -> int:
+        if not text:
+            return 0
+
+        key = hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        tokens = await self.tokenize(text, model=model)
+        if tokens is None:
+            return estimate_tokens(text)
+
+        self.cache[key] = tokens
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return tokens
+
+    async def count_messages(self, messages: list[dict[str, Any]], *, model: str) -> list[int]:
+        tokens = await asyncio.gather(
+            *[self.count(message_text(message), model=model) for message in messages]
+        )
+        return [count + CONTEXT_MESSAGE_OVERHEAD_TOKENS for count in tokens]
+
+
+@dataclass
+class ContextFitReport:
+    model: str
+    budget: int
+    tokens_before: int
+    tokens_after: int
+    compacted: int = field(default=0)
+    summarized: int = field(default=0)
+    dropped: int = field(default=0)
+    clipped: int = field(default=0)
+
+    @property
+    def tokens_trimmed(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+
+@dataclass
+class ContextWindow:
+    counter: TokenCounter = field(default_factory=TokenCounter)
+    context_sizes: dict[str, int] = field(default_factory=lambda: LLM_CONTEXT_SIZES)
+    default_context_size: int = field(default=LLM_DEFAULT_CONTEXT_SIZE)
+    policies: list[ContextTrimPolicy] = field(default_factory=lambda: CONTEXT_TRIM_POLICIES)
+    safety_margin: int = field(default=CONTEXT_SAFETY_MARGIN_TOKENS)
+    compact_message_tokens: int = field(default=CONTEXT_COMPACT_MESSAGE_TOKENS)
+
+    def budget(self, model: str, *, max_tokens: int) -> int:
+        context_size = self.context_sizes.get(model, self.default_context_size)
+        return context_size - max_tokens - self.safety_margin
+
+    @staticmethod
+    def pinned(messages: list[dict[str, Any]]) -> set[int]:
+        # System messages and the prompt being answered are never trimmed
+        pinned = {index for index, message in enumerate(messages) if message["role"] == "system"}
+        users = [index for index, message in enumerate(messages) if message["role"] == "user"]
+        if len(users) > 0:
+            pinned.add(users[-1])
+        return pinned
+
+    @staticmethod
+    def turns(messages: list[dict[str, Any]]) -> list[list[int]]:
+        # Tool results stay with the assistant message that asked for them
+        pinned = ContextWindow.pinned(messages)
+        turns: list[list[int]] = []
+        for index, message in enumerate(messages):
+            if index in pinned:
+                continue
+            if message["role"] != "tool" or len(turns) == 0:
+                turns.append([])
+            turns[-1].append(index)
+        return turns
+
+    async def fit(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        model: str,
+        max_tokens: int,
+        tools: list[Any] = [],
+    ) -> tuple[list[dict[str, Any]], ContextFitReport]:
+        messages = list(messages)
+        tokens = await self.counter.count_messages(messages, model=model)
+        tools_tokens = (
+            await self.counter.count(json.dumps(tools, default=str), model=model)
+            if len(tools) > 0
+            else 0
+        )
+
+        budget = self.budget(model, max_tokens=max_tokens)
+        report = ContextFitReport(
+            model=model,
+            budget=budget,
+            tokens_before=sum(tokens) + tools_tokens,
+            tokens_after=sum(tokens) + tools_tokens,
+        )
+
+        for policy in self.policies:
+            if sum(tokens) + tools_tokens <= budget:
+                break
+
+            if policy == "compact":
+                await self.compact(
+                    messages, tokens, model=model, budget=budget - tools_tokens, report=report
+                )
+            elif policy == "summarize":
+                await self.summarize(
+                    messages, tokens, model=model, budget=budget - tools_tokens, report=report
+                )
+            elif policy == "drop":
+                self.drop(messages, tokens, budget=budget - tools_tokens, report=report)
+
+        # The latest tool results are what the model is answering from, so they only lose what doesn't fit,
+        # largest first
+        turns = self.turns(messages)
+        results = [index for index in turns[-1] if messages[index]["role"] == "tool"] if turns else []
+        await self.clip(
+            messages,
+            tokens,
+            sorted(results, key=lambda index: tokens[index], reverse=True),
+            model=model,
+            budget=budget - tools_tokens,
+            report=report,
+        )
+        # Failing the request would end the turn, so as a last resort the newest messages lose their tails,
+        # the prompt included
+        await self.clip(
+            messages,
+            tokens,
+            [index for index in reversed(range(len(messages))) if messages[index]["role"] != "system"],
+            model=model,
+            budget=budget - tools_tokens,
+            report=report,
+        )
+
+        report.tokens_after = sum(tokens) + tools_tokens
+        return messages, report
+
+    async def compact(
+        self,
+        messages: list[dict[str, Any]],
+        tokens: list[int],
+        *,
+        model: str,
+        budget: int,
+        report: ContextFitReport,
+    ):
+        max_chars = int(self.compact_message_tokens * APPROXIMATE_CHARS_PER_TOKEN)
+        for turn in self.turns(messages)[:-1]:
+            for index in turn:
+                if sum(tokens) <= budget:
+                    return
+
+                content = messages[index].get("content")
+                if not isinstance(content, str) or tokens[index] <= self.compact_message_tokens:
+                    continue
+
+                messages[index] = {
+                    **messages[index],
+                    "content": f"{content[:max_chars]}\n[... truncated ...]",
+                }
+                tokens[index] = (
+                    await self.counter.count(message_text(messages[index]), model=model)
+                    + CONTEXT_MESSAGE_OVERHEAD_TOKENS
+                )
+                report.compacted += 1
+
+    async def clip(
+        self,
+        messages: list[dict[str, Any]],
+        tokens: list[int],
+        indices: list[int],
+        *,
+        model: str,
+        budget: int,
+        report: ContextFitReport,
+    ):
+        # Cuts the tails off the given messages, in order, until everything fits
+        for index in indices:
+            content = messages[index].get("content")
+            if not isinstance(content, str) or len(content) == 0:
+                continue
+
+            if sum(tokens) <= budget:
+                return
+
+            # Estimates can undercount, so shrink again if the first cut wasn't enough
+            for _ in range(3):
+                excess = sum(tokens) - budget
+                if excess <= 0 or len(content) == 0:
+                    break
+
+                content = content[: max(0, len(content) - math.ceil(excess * APPROXIMATE_CHARS_PER_TOKEN))]
+                messages[index] = {**messages[index], "content": f"{content}\n[... truncated ...]"}
+                tokens[index] = (
+                    await self.counter.count(message_text(messages[index]), model=model)
+                    + CONTEXT_MESSAGE_OVERHEAD_TOKENS
+                )
+            report.clipped += 1
+
+    async def summarize(
+        self,
+        messages: list[dict[str, Any]],
+        tokens: list[int],
+        *,
+        model: str,
+        budget: int,
+        report: ContextFitReport,
+    ):
+        from src.llm.summarizer import summarizer
+
+        # Leave room for the summary itself
+        excess = sum(tokens) - budget + self.compact_message_tokens
+        summarized: list[int] = []
+        for turn in self.turns(messages)[:-1]:
+            if sum(tokens[index] for index in summarized) >= excess:
+                break
+            summarized.extend(turn)
+
+        if len(summarized) == 0:
+            return
+
+        transcript = "\n".join(
+            f"{messages[index]['role']} said: {message_text(messages[index])}"
+            for index in summarized
+        )
+        summary = await summarizer.asummarize(transcript, stream=False)
+        summary_message = ChatHistory().inject_tool_call_result(
+            tool_name="summary_of_earlier_messages", content=summary
+        )[0]
+        summary_tokens = (
+            await self.counter.count(message_text(summary_message), model=model)
+            + CONTEXT_MESSAGE_OVERHEAD_TOKENS
+        )
+
+        removed = set(summarized)
+        kept = [index for index in range(len(messages)) if index not in removed]
+        position = next(
+            (i for i, index in enumerate(kept) if index > summarized[0]), len(kept)
+        )
+        messages[:] = [
+            *[messages[index] for index in kept[:position]],
+            summary_message,
+            *[messages[index] for index in kept[position:]],
+        ]
+        tokens[:] = [
+            *[tokens[index] for index in kept[:position]],
+            summary_tokens,
+            *[tokens[index] for index in kept[position:]],
+        ]
+        report.summarized += len(summarized)
+
+    def drop(
+        self,
+        messages: list[dict[str, Any]],
+        tokens: list[int],
+        *,
+        budget: int,
+        report: ContextFitReport,
+    ):
+        total = sum(tokens)
+        dropped: set[int] = set()
+        for turn in self.turns(messages)[:-1]:
+            if total <= budget:
+                break
+            dropped.update(turn)
+            total -= sum(tokens[index] for index in turn)
+
+        messages[:] = [message for index, message in enumerate(messages) if index not in dropped]
+        tokens[:] = [count for index, count in enumerate(tokens) if index not in dropped]
+        report.dropped += len(dropped)
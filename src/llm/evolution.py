@@ -1,3 +1,5 @@
+import atexit
+import hashlib
 import importlib.util
 import inspect
 import json
@@ -15,6 +17,9 @@ from openai.types.chat import (
 )
 from openai.types.chat.chat_completion_tool_param import FunctionDefinition
 
+from src.constants import TOOL_SCHEMA_CACHE_PATH
+from src.utils import JsonFileCache
+
 
 @dataclass
 class Tool:
@@ -22,6 +27,8 @@ class Tool:
     invoke: Callable
     requires_hitl: bool = field(default=False)
     standalone: bool = field(default=False)
+    # Only side-effect free tools may run concurrently with other tool calls
+    read_only: bool = field(default=False)
 
 
 tool_registry: dict[str, Tool] = {}
@@ -37,6 +44,24 @@ class ToolCallResult:
         return json.dumps(asdict(self))
 
 
+class ToolSchemaCache(JsonFileCache[ChatCompletionFunctionToolParam]):
+    @staticmethod
+    def key(func: Callable) -> str | None:
+        try:
+            source = inspect.getsource(inspect.unwrap(func))
+        except (OSError, TypeError):
+            return None
+
+        fingerprint = "\0".join(
+            [source, str(inspect.signature(func)), inspect.getdoc(func) or ""]
+        )
+        return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+tool_schema_cache = ToolSchemaCache(path=TOOL_SCHEMA_CACHE_PATH)
+atexit.register(lambda: tool_schema_cache.save())
+
+
 # Credit: https://github.com/ollama/ollama-python/blob/main/ollama/_utils.py#L13
 def _parse_docstring(doc_string: str | None) -> dict[str, str]:
     parsed_docstring = defaultdict(str)
@@ -131,44 +156,82 @@ class Description:
     args: list[tuple[str, str]] = field(default_factory=lambda: [])
     returns: list[tuple[str, str]] = field(default_factory=lambda: [])
 
+def get_tool_spec(func: Callable) -> ChatCompletionFunctionToolParam:
+    key = ToolSchemaCache.key(func)
+    if key is None:
+        return convert_function_to_tool(func)
+
+    spec = tool_schema_cache.get(key)
+    if spec is None:
+        spec = convert_function_to_tool(func)
+        tool_schema_cache.set(key, spec)
+    return spec
+
+
 def tool(func: Callable):
     @wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
 
-    tool = Tool(spec=convert_function_to_tool(wrapper), invoke=wrapper)
+    tool = Tool(spec=get_tool_spec(wrapper), invoke=wrapper)
     tool_registry[wrapper.__name__] = tool
     return tool
 
 
+@dataclass
+class LoadedToolModule:
+    fingerprint: str
+    tools: list[tuple[str, Tool]]
+
+
+loaded_tool_modules: dict[str, LoadedToolModule] = {}
+
+
+def get_file_fingerprint(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
 def get_tools_from(*, dir: str, module_name: str, evolved: bool):
     module_path = os.path.join(dir, f"{module_name}.py")
     package_name = os.path.relpath(dir).replace(os.path.sep, ".")
 
     module_name = f"{package_name}.{module_name}" if package_name else module_name
 
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
-
-    if spec is None or spec.loader is None:
-        return []
-
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-
-    tools: list[tuple[str, Tool]] = [
-        *filter(
-            lambda t: not t[1].standalone,
-            inspect.getmembers(
-                module,
-                lambda m: isinstance(m, Tool),
-            ),
+    fingerprint = get_file_fingerprint(module_path)
+    cache_key = os.path.abspath(module_path)
+    loaded_module = loaded_tool_modules.get(cache_key)
+
+    if loaded_module is None or loaded_module.fingerprint != fingerprint:
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+
+        if spec is None or spec.loader is None:
+            return []
+
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        loaded_module = LoadedToolModule(
+            fingerprint=fingerprint,
+            tools=[
+                *filter(
+                    lambda t: not t[1].standalone,
+                    inspect.getmembers(
+                        module,
+                        lambda m: isinstance(m, Tool),
+                    ),
+                )
+            ],
         )
-    ]
+        loaded_tool_modules[cache_key] = loaded_module
+
+    tools = loaded_module.tools
     tool_specs = [tool.spec for (_, tool) in tools]
     for tool_name, tool in tools:
         tool_registry[tool_name] = Tool(
             spec=tool.spec,
             invoke=tool.invoke,
             requires_hitl=True if evolved else tool.requires_hitl,
+            read_only=False if evolved else tool.read_only,
         )
     return tool_specs
@@ -0,0 +1,57 @@
+import hashlib
+import re
+from typing import Any
+
+# Injected results are named `{tool_name}-{uuid4}`, see `ChatHistory.inject_tool_call_result`
+INJECTED_TOOL_CALL_ID_SUFFIX = re.compile(r"-?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def injected_tool_call_ids(messages: list[dict[str, Any]]) -> set[str]:
+    # Injected tool results answer no tool call the assistant actually made
+    requested_ids = {
+        tool_call["id"] if isinstance(tool_call, dict) else tool_call.id
+        for message in messages
+        if message["role"] == "assistant"
+        for tool_call in message.get("tool_calls") or []
+    }
+    return {
+        message["tool_call_id"]
+        for message in messages
+        if message["role"] == "tool" and message.get("tool_call_id") not in requested_ids
+    }
+
+
+def stable_prompt_layout(
+    messages: list[dict[str, Any]], tools: list[Any]
+) -> tuple[list[dict[str, Any]], list[Any]]:
+    # llama-server only reuses its KV cache up to the first differing token, so the invariant prefix
+    # is kept byte-stable: the leading system messages merged into one and the tools in a fixed order.
+    # Everything after it keeps its order, injected results answer the turn they were injected into
+    leading = 0
+    while leading < len(messages) and messages[leading]["role"] == "system":
+        leading += 1
+
+    layout: list[dict[str, Any]] = []
+    if leading > 0:
+        layout.append(
+            {
+                "role": "system",
+                "content": "\n\n".join(str(message["content"]) for message in messages[:leading]),
+            }
+        )
+
+    injected_ids = injected_tool_call_ids(messages)
+    for message in messages[leading:]:
+        if message["role"] == "tool" and message.get("tool_call_id") in injected_ids:
+            # Random ids would make otherwise identical injections differ byte-wise, the tool name stays
+            # so the model can still tell the injections apart
+            tool_name = INJECTED_TOOL_CALL_ID_SUFFIX.sub("", str(message["tool_call_id"])) or "injected"
+            digest = hashlib.sha256(str(message.get("content")).encode()).hexdigest()
+            message = {**message, "tool_call_id": f"{tool_name}-{digest[:16]}"}
+        layout.append(message)
+
+    tools = sorted(
+        tools,
+        key=lambda tool: tool.get("function", {}).get("name", "") if isinstance(tool, dict) else "",
+    )
+    return layout, tools
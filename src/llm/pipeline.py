@@ -1,8 +1,27 @@
-from dataclasses import dataclass, field
+import json
+import traceback
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
 
+from openai.types.chat import ParsedChatCompletionMessage, ParsedFunctionToolCall
+from openai.types.chat.parsed_function_tool_call import ParsedFunction
+
+from src.llm.history import ChatHistory
+from src.llm.router import (
+    RouterStats,
+    RoutingCache,
+    SemanticRouter,
+    routing_cache as default_routing_cache,
+    semantic_router as default_semantic_router,
+)
 from src.llm.spawner.assistant import spawn_assistant_actor
+from src.llm.summarizer import RollingSummary
+from src.llm.session.actor.assistant import AssistantActor
 from src.llm.session.actor.tool import ToolActor
+from src.llm.session.precompute import PrecomputedInjection
 from src.llm.session.session import Session
+from src.llm.warmup import ModelWarmer
 from src.llm.utils import (
     LLMGenerationConfig,
     SemanticRouterTarget,
@@ -11,31 +30,60 @@ from src.llm.utils import (
 from src.constants import (
     AGENTIC_SYSTEM_PROMPT,
     CONVERSATIONAL_SYSTEM_PROMPT,
-    GENERALIST_LLM,
+    EVOLVED_AGENT_DIR,
     PRIMITIVE_TOOLS_DIR,
     SEARCH_SYSTEM_PROMPT,
+    SEMANTIC_ROUTER_TARGET_LLMS,
     SYSTEM_REMINDERS,
 )
 from src.llm.client import LLMClient
 from src.llm.evolution import ToolCallResult, get_tools_from
+from src.utils import path_fingerprint
+from src.vector_db.embedding_cache import embedding_cache
+from src.vector_db.knowledge_base import knowledge_base
 
 
 @dataclass
 class SeaConfig:
     llm_client: LLMClient
     session: Session
-    short_term_memory: int = field(default=5)
 
 
 class SeaPipeline:
     def __init__(self, *, config: SeaConfig):
         self.config = config
+        self.precomputed_injections: dict[str, PrecomputedInjection] = {}
+        self.router_stats: RouterStats | None = None
+        # Buffered knowledge base writes shouldn't wait for the buffer to fill up across rounds
+        self.config.session.state.handle_round_end(knowledge_base.write_behind)
+
+    def precomputed_injection(
+        self,
+        name: str,
+        *,
+        handler: Callable[[], Any],
+        fingerprint: Callable[[], Hashable],
+    ) -> PrecomputedInjection:
+        # Computed in the background as soon as a round ends, i.e. while the user is typing
+        if name not in self.precomputed_injections:
+            injection = PrecomputedInjection(handler=handler, fingerprint=fingerprint)
+            injection.precompute()
+            self.config.session.state.handle_round_end(injection.precompute)
+            self.precomputed_injections[name] = injection
+
+        return self.precomputed_injections[name]
 
     def with_available_agents_injection(self, *, deferred: bool = False):
         from src.llm.tools import get_available_agents
 
+        precomputed_agents = self.precomputed_injection(
+            get_available_agents.invoke.__name__,
+            handler=get_available_agents.invoke,
+            fingerprint=lambda: path_fingerprint(EVOLVED_AGENT_DIR),
+        )
+
         def injection():
-            agents = get_available_agents.invoke()
+            agents = precomputed_agents()
             print(f"[INJECTION] [AVAILABLE AGENTS] {agents}")
             return agents
 
@@ -51,8 +99,15 @@ class SeaPipeline:
     def with_available_knowledge_base_collections_injection(self, *, deferred: bool = False):
         from src.llm.tools import get_available_collections_in_knowledge_base
 
+        precomputed_collections = self.precomputed_injection(
+            get_available_collections_in_knowledge_base.invoke.__name__,
+            handler=get_available_collections_in_knowledge_base.invoke,
+            # The injection only lists names, and a delete followed by a create keeps the count the same
+            fingerprint=lambda: tuple(sorted(knowledge_base.collection_names())),
+        )
+
         def injection():
-            available_collections = get_available_collections_in_knowledge_base.invoke()
+            available_collections = precomputed_collections()
             print(
                 f"[INJECTION] [AVAILABLE KNOWLEDGE BASE COLLECTIONS] {available_collections}"
             )
@@ -67,6 +122,63 @@ class SeaPipeline:
         )
         return self
 
+    def with_model_swap_report(self):
+        scheduler = self.config.llm_client.scheduler
+        last_round = scheduler.snapshot()
+
+        def report():
+            nonlocal last_round
+            current = scheduler.snapshot()
+            stats = current.since(last_round)
+            last_round = current
+            print(
+                f"[MODEL SCHEDULER] {stats.swaps} model swaps in {stats.requests} requests, "
+                f"~{stats.swap_seconds:.2f}s spent swapping (resident: {scheduler.resident}); "
+                f"time to first token {stats.cold_time_to_first_token:.2f}s after a swap, "
+                f"{stats.warm_time_to_first_token:.2f}s on a loaded model"
+            )
+
+        self.config.session.state.handle_round_end(report)
+        return self
+
+    def with_embedding_cache_report(self):
+        def report():
+            stats = embedding_cache.stats
+            # Nothing to report until a round actually touches the knowledge base
+            if stats.hits + stats.misses == 0:
+                return
+
+            print(
+                f"[EMBEDDING CACHE] {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions "
+                f"(hit rate {stats.hit_rate:.0%}), {len(embedding_cache)} texts cached"
+            )
+            embedding_cache.save()
+
+        self.config.session.state.handle_round_end(report)
+        return self
+
+    def with_model_warm_up(self, *, warmer: ModelWarmer | None = None):
+        # Loads the model the next round most likely starts with while the user is typing
+        warmer = warmer or ModelWarmer(llm_client=self.config.llm_client)
+
+        def warm_up():
+            if self.router_stats is None:
+                return
+
+            warmer.warm_up(
+                self.router_stats.likely_next_model(),
+                after=[
+                    injection.future
+                    for injection in self.precomputed_injections.values()
+                    if injection.future is not None
+                ],
+            )
+
+        warm_up()
+        self.config.session.state.handle_round_end(warm_up)
+        self.config.session.state.handle_round_start(warmer.cancel)
+        return self
+
     def force_llm_to_think(self, *, deferred: bool = False):
         self.config.session.ops.injection.inject_tool(
             ToolActor.injected(
@@ -76,9 +188,17 @@ class SeaPipeline:
         )
         return self
 
-    def with_semantic_router(self, *, config: LLMGenerationConfig):
+    def with_semantic_router(
+        self,
+        *,
+        config: LLMGenerationConfig,
+        semantic_router: SemanticRouter | None = default_semantic_router,
+        routing_cache: RoutingCache | None = default_routing_cache,
+    ):
         from src.llm.tools import categorize_prompt
 
+        self.router_stats = RouterStats(router_model=str(config.model))
+
         def categorize_prompt_handler(tool_call_result: ToolCallResult):
             category: SemanticRouterTarget | None = None
 
@@ -90,6 +210,16 @@ class SeaPipeline:
             if category not in SEMANTIC_ROUTER_TARGETS:
                 return
 
+            if self.router_stats is not None:
+                self.router_stats.record(category, llm=routed_prompt.get("llm", True))
+
+            if routing_cache is not None and "prompt" in routed_prompt:
+                routing_cache.store(
+                    routed_prompt["prompt"],
+                    category,
+                    embedding=routed_prompt["embedding"],
+                )
+
             self.with_available_knowledge_base_collections_injection(deferred=True)
             match category:
                 case "search":
@@ -98,6 +228,7 @@ class SeaPipeline:
                         dump_knowledge_base_collection,
                         query_knowledge_base,
                         search_for_information_on_the_web,
+                        search_knowledge_base,
                     )
 
                     self.config.session.ops.injection.inject_system_prompt(
@@ -105,10 +236,11 @@ class SeaPipeline:
                     )
                     self.config.session.main_assistant_actor = spawn_assistant_actor(
                         llm_client=self.config.llm_client,
-                        config=config.with_model(GENERALIST_LLM),
+                        config=config.with_model(SEMANTIC_ROUTER_TARGET_LLMS[category]),
                         tools_factory=lambda: [
                             dump_knowledge_base_collection.spec,
                             query_knowledge_base.spec,
+                            search_knowledge_base.spec,
                             search_for_information_on_the_web.spec,
                         ],
                     )
@@ -122,7 +254,7 @@ class SeaPipeline:
                     self.force_llm_to_think(deferred=True)
                     self.config.session.main_assistant_actor = spawn_assistant_actor(
                         llm_client=self.config.llm_client,
-                        config=config.with_model(GENERALIST_LLM),
+                        config=config.with_model(SEMANTIC_ROUTER_TARGET_LLMS[category]),
                         tools_factory=lambda: get_tools_from(
                             dir=PRIMITIVE_TOOLS_DIR,
                             module_name="tools",
@@ -135,6 +267,7 @@ class SeaPipeline:
                     from src.llm.tools import (
                         dump_knowledge_base_collection,
                         query_knowledge_base,
+                        search_knowledge_base,
                         add_to_knowledge_base,
                         update_data_in_knowledge_base,
                         forget_data_from_knowledge_base,
@@ -146,23 +279,88 @@ class SeaPipeline:
                     )
                     self.config.session.main_assistant_actor = spawn_assistant_actor(
                         llm_client=self.config.llm_client,
-                        config=config.with_model(GENERALIST_LLM),
+                        config=config.with_model(SEMANTIC_ROUTER_TARGET_LLMS[category]),
                         tools_factory=lambda: [
                             dump_knowledge_base_collection.spec,
                             query_knowledge_base.spec,
+                            search_knowledge_base.spec,
                             add_to_knowledge_base.spec,
                             update_data_in_knowledge_base.spec,
                             forget_data_from_knowledge_base.spec,
                         ],
                     )
 
+        llm_router = spawn_assistant_actor(
+            before_stream=lambda: print("[RUNNING SEMANTIC ROUTER]"),
+            turns_allowed=1,
+            llm_client=self.config.llm_client,
+            config=config,
+            tools_factory=lambda: [categorize_prompt.spec],
+        )
+
+        routed_prompt: dict[str, Any] = {}
+
+        def router_response_factory(
+            history: ChatHistory,
+        ) -> ParsedChatCompletionMessage[None]:
+            assert llm_router.response_factory is not None
+
+            routed_prompt.clear()
+            prompts = [
+                message["content"] for message in history if message["role"] == "user"
+            ]
+            if len(prompts) == 0:
+                return llm_router.response_factory(history)
+
+            prompt = prompts[-1]
+            embedding = None
+            if semantic_router is not None:
+                try:
+                    embedding = semantic_router.embed([prompt])[0]
+                except Exception:
+                    print(f"[SEMANTIC ROUTER] Embedding router failed\n{traceback.format_exc()}")
+            routed_prompt.update(prompt=prompt, embedding=embedding)
+
+            category: SemanticRouterTarget | None = None
+            if routing_cache is not None:
+                category = routing_cache.lookup(prompt, embedding=embedding)
+                if category is not None:
+                    print(
+                        f"[ROUTING CACHE] Routed to `{category}` (hit rate {routing_cache.stats.hit_rate:.0%})"
+                    )
+
+            if category is None and semantic_router is not None and embedding is not None:
+                decision = semantic_router.route(prompt, embedding=embedding)
+                if decision is not None:
+                    category = decision.category
+                    print(
+                        f"[SEMANTIC ROUTER] Routed to `{decision.category}` (confidence {decision.confidence:.2f})"
+                    )
+
+            if category is None:
+                return llm_router.response_factory(history)
+
+            routed_prompt.update(llm=False)
+            return ParsedChatCompletionMessage[None](
+                role="assistant",
+                content="",
+                tool_calls=[
+                    ParsedFunctionToolCall(
+                        id=str(uuid.uuid4()),
+                        type="function",
+                        function=ParsedFunction(
+                            name=categorize_prompt.invoke.__name__,
+                            arguments=json.dumps({"category": category}),
+                            parsed_arguments={"category": category},
+                        ),
+                    )
+                ],
+            )
+
         self.config.session.ops.injection.inject_assistant(
-            spawn_assistant_actor(
-                before_stream=lambda: print("[RUNNING SEMANTIC ROUTER]"),
+            AssistantActor.with_stream(
+                response_factory=router_response_factory,
                 turns_allowed=1,
-                llm_client=self.config.llm_client,
-                config=config,
-                tools_factory=lambda: [categorize_prompt.spec],
             )
         )
         self.config.session.state.handle_tool_call_result(
@@ -173,42 +371,31 @@ class SeaPipeline:
         return self
 
     def with_short_term_memory_summary(self):
-        from src.llm.tools import summarize
+        state = self.config.session.state
+        rolling_summary = RollingSummary(persistence=state.chat_history_persistence)
 
-        def injection():
-            system_message_indexes: list[int] = []
-            full_chat_history = [
-                message
-                for history in self.config.session.state.chat_histories
-                for message in history
-            ]
-            for idx, message in enumerate(full_chat_history):
-                if message["role"] == "system":
-                    if len(system_message_indexes) > self.config.short_term_memory:
-                        system_message_indexes.pop(0)
-                    system_message_indexes.append(idx)
+        def update_summary():
+            rolling_summary.load()
+            if len(state.chat_histories) == rolling_summary.summarized_rounds:
+                return rolling_summary.summary or None
 
-            if len(system_message_indexes) == 0:
-                return
+            return rolling_summary.update(state.chat_histories) or None
 
-            start = system_message_indexes[0]
-            end = system_message_indexes[-1]
-            windowed_context = (
-                full_chat_history[start:end]
-                if end != start
-                else full_chat_history[start:]
-            )
-            return summarize.invoke(
-                "\n".join(
-                    [
-                        f"{message['role']} said: {message['content']}"
-                        for message in windowed_context
-                        if "content" in message
-                        and message["content"]
-                        and message["role"] != "system"
-                    ]
+        precomputed_summary = self.precomputed_injection(
+            "summary_of_ongoing_conversation",
+            handler=update_summary,
+            fingerprint=lambda: len(state.chat_histories),
+        )
+
+        def injection():
+            summary = precomputed_summary()
+            if len(rolling_summary.rounds) > 0:
+                last_round = rolling_summary.rounds[-1]
+                print(
+                    f"[ROLLING SUMMARY] Folded in {last_round.new_messages} new messages, "
+                    f"sent ~{last_round.tokens_sent} tokens, saved ~{last_round.tokens_saved} tokens"
                 )
-            )
+            return summary
 
         self.config.session.ops.injection.inject_tool(
             ToolActor.from_injected_handler(
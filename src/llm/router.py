@@ -0,0 +1,190 @@
+import atexit
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+from src.constants import (
+    ROUTING_CACHE_CAPACITY,
+    ROUTING_CACHE_PATH,
+    ROUTING_CACHE_SIMILARITY_THRESHOLD,
+    SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD,
+    SEMANTIC_ROUTER_EXEMPLARS,
+    SEMANTIC_ROUTER_TARGET_LLMS,
+)
+from src.llm.utils import SemanticRouterTarget
+from src.utils import JsonFileCache
+from src.vector_db.embeddings import embedding_function
+
+EmbeddingFunction = Callable[[list[str]], Sequence[Sequence[float]]]
+
+
+@dataclass
+class RoutingDecision:
+    category: SemanticRouterTarget
+    confidence: float
+
+
+@dataclass
+class SemanticRouter:
+    embedding_function: EmbeddingFunction
+    exemplars: dict[SemanticRouterTarget, list[str]] = field(
+        default_factory=lambda: SEMANTIC_ROUTER_EXEMPLARS
+    )
+    threshold: float = field(default=SEMANTIC_ROUTER_CONFIDENCE_THRESHOLD)
+
+    def __post_init__(self):
+        self.categories: list[SemanticRouterTarget] = [
+            category
+            for category, exemplars in self.exemplars.items()
+            for _ in exemplars
+        ]
+        self.exemplar_embeddings: np.ndarray | None = None
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        embeddings = np.asarray(self.embedding_function(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def scores(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.exemplar_embeddings is None:
+            self.exemplar_embeddings = self.embed(
+                [exemplar for exemplars in self.exemplars.values() for exemplar in exemplars]
+            )
+
+        similarities = embeddings @ self.exemplar_embeddings.T
+        categories = np.asarray(self.categories)
+        return np.stack(
+            [
+                similarities[:, categories == category].max(axis=1)
+                for category in self.exemplars
+            ],
+            axis=1,
+        )
+
+    def classify(
+        self, prompts: list[str], *, embeddings: np.ndarray | None = None
+    ) -> list[RoutingDecision]:
+        scores = self.scores(embeddings if embeddings is not None else self.embed(prompts))
+        best = scores.argmax(axis=1)
+        targets = list(self.exemplars)
+        return [
+            RoutingDecision(category=targets[index], confidence=float(scores[row, index]))
+            for row, index in enumerate(best)
+        ]
+
+    def route(
+        self, prompt: str, *, embedding: np.ndarray | None = None
+    ) -> RoutingDecision | None:
+        decision = self.classify(
+            [prompt], embeddings=embedding[None, :] if embedding is not None else None
+        )[0]
+        if decision.confidence < self.threshold:
+            return None
+        return decision
+
+
+@dataclass
+class RoutingCacheEntry:
+    category: SemanticRouterTarget
+    embedding: list[float] | None = field(default=None)
+
+
+@dataclass
+class RoutingCacheStats:
+    hits: int = field(default=0)
+    near_duplicate_hits: int = field(default=0)
+    misses: int = field(default=0)
+    evictions: int = field(default=0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.near_duplicate_hits + self.misses
+        return (self.hits + self.near_duplicate_hits) / lookups if lookups else 0.0
+
+
+class RoutingCache(JsonFileCache[dict[str, Any]]):
+    def __init__(
+        self,
+        *,
+        path: str,
+        capacity: int = ROUTING_CACHE_CAPACITY,
+        similarity_threshold: float = ROUTING_CACHE_SIMILARITY_THRESHOLD,
+    ):
+        super().__init__(path=path, capacity=capacity)
+        self.similarity_threshold = similarity_threshold
+        self.stats = RoutingCacheStats()
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+    def lookup(
+        self, prompt: str, *, embedding: np.ndarray | None = None
+    ) -> SemanticRouterTarget | None:
+        cached = self.get(self.normalize(prompt))
+        if cached is not None:
+            self.stats.hits += 1
+            return RoutingCacheEntry(**cached).category
+
+        with self.lock:
+            candidates = [
+                (cached_prompt, RoutingCacheEntry(**entry))
+                for cached_prompt, entry in self.load().items()
+                if entry.get("embedding") is not None
+            ]
+        if embedding is not None and len(candidates) > 0:
+            similarities = (
+                np.asarray([entry.embedding for _, entry in candidates], dtype=np.float32)
+                @ embedding
+            )
+            best = int(similarities.argmax())
+            if similarities[best] >= self.similarity_threshold:
+                cached_prompt, entry = candidates[best]
+                # Refreshes its position in the LRU order
+                self.get(cached_prompt)
+                self.stats.near_duplicate_hits += 1
+                return entry.category
+
+        self.stats.misses += 1
+        return None
+
+    def store(
+        self,
+        prompt: str,
+        category: SemanticRouterTarget,
+        *,
+        embedding: np.ndarray | None = None,
+    ):
+        entry = RoutingCacheEntry(
+            category=category,
+            embedding=embedding.tolist() if embedding is not None else None,
+        )
+        self.stats.evictions += self.set(self.normalize(prompt), asdict(entry))
+
+
+@dataclass
+class RouterStats:
+    router_model: str
+    llm_routed: int = field(default=0)
+    categories: dict[SemanticRouterTarget, int] = field(default_factory=lambda: {})
+
+    def record(self, category: SemanticRouterTarget, *, llm: bool):
+        self.categories[category] = self.categories.get(category, 0) + 1
+        if llm:
+            self.llm_routed += 1
+
+    def likely_next_model(self) -> str:
+        # The first model a round needs is the router's, unless prompts usually skip the LLM router
+        routed = sum(self.categories.values())
+        if routed == 0 or self.llm_routed / routed >= 0.5:
+            return self.router_model
+
+        category = max(self.categories, key=lambda category: self.categories[category])
+        return SEMANTIC_ROUTER_TARGET_LLMS[category]
+
+
+semantic_router = SemanticRouter(embedding_function=embedding_function)
+routing_cache = RoutingCache(path=ROUTING_CACHE_PATH)
+atexit.register(routing_cache.save)
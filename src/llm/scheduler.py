@@ -0,0 +1,127 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator
+
+from src.constants import LLM_MODEL_ALIASES
+
+
+@dataclass
+class ModelSchedulerStats:
+    requests: int = field(default=0)
+    swaps: int = field(default=0)
+    swap_seconds: float = field(default=0.0)
+    resident_first_token_seconds: float = field(default=0.0)
+
+    def since(self, other: "ModelSchedulerStats") -> "ModelSchedulerStats":
+        return ModelSchedulerStats(
+            requests=self.requests - other.requests,
+            swaps=self.swaps - other.swaps,
+            swap_seconds=self.swap_seconds - other.swap_seconds,
+            resident_first_token_seconds=self.resident_first_token_seconds
+            - other.resident_first_token_seconds,
+        )
+
+    @property
+    def cold_time_to_first_token(self) -> float:
+        return self.swap_seconds / self.swaps if self.swaps else 0.0
+
+    @property
+    def warm_time_to_first_token(self) -> float:
+        resident_requests = self.requests - self.swaps
+        return self.resident_first_token_seconds / resident_requests if resident_requests else 0.0
+
+
+@dataclass
+class ScheduledRequest:
+    scheduler: "ModelScheduler"
+    model: str
+    swapped: bool
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: float | None = field(default=None)
+
+    def on_first_token(self):
+        if self.first_token_at is not None:
+            return
+
+        self.first_token_at = time.perf_counter()
+        # llama-swap loads the model before answering, so the first token is when the swap is over
+        if self.swapped:
+            self.scheduler.stats.swap_seconds += self.first_token_at - self.started_at
+        else:
+            self.scheduler.stats.resident_first_token_seconds += (
+                self.first_token_at - self.started_at
+            )
+
+
+@dataclass
+class ModelScheduler:
+    aliases: dict[str, str] = field(default_factory=lambda: LLM_MODEL_ALIASES)
+
+    def __post_init__(self):
+        self.resident: str | None = None
+        self.running = 0
+        # Tickets of the requests waiting for each model, in arrival order
+        self.waiting: dict[str, list[int]] = {}
+        self.tickets = itertools.count()
+        # Requests queued for the resident model when its batch started may join it, whoever else is waiting
+        self.batch_ticket = -1
+        self.condition: asyncio.Condition | None = None
+        self.stats = ModelSchedulerStats()
+
+    def resolve(self, model: str) -> str:
+        return self.aliases.get(model, model)
+
+    def snapshot(self) -> ModelSchedulerStats:
+        return replace(self.stats)
+
+    def can_run(self, model: str, ticket: int) -> bool:
+        # Join the batch running on the resident model, unless others are already waiting for it to drain
+        if model == self.resident and (
+            ticket <= self.batch_ticket or all(waiting == model for waiting in self.waiting)
+        ):
+            return True
+
+        if self.running > 0:
+            return False
+
+        # The resident model is idle, swap to whichever model has been waiting the longest
+        return model == min(self.waiting, key=lambda waiting: self.waiting[waiting][0])
+
+    @asynccontextmanager
+    async def acquire(self, model: str) -> AsyncIterator[ScheduledRequest]:
+        model = self.resolve(model)
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        async with self.condition:
+            ticket = next(self.tickets)
+            self.waiting.setdefault(model, []).append(ticket)
+            try:
+                await self.condition.wait_for(lambda: self.can_run(model, ticket))
+                if model != self.resident or self.running == 0:
+                    # A new batch takes everything already queued for its model along
+                    self.batch_ticket = self.waiting[model][-1]
+            finally:
+                self.waiting[model].remove(ticket)
+                if len(self.waiting[model]) == 0:
+                    del self.waiting[model]
+                self.condition.notify_all()
+
+            request = ScheduledRequest(
+                scheduler=self, model=model, swapped=model != self.resident
+            )
+            if request.swapped:
+                self.stats.swaps += 1
+            self.stats.requests += 1
+            self.resident = model
+            self.running += 1
+
+        try:
+            yield request
+        finally:
+            async with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
@@ -1,3 +1,4 @@
+from concurrent.futures import Executor, Future
 from dataclasses import dataclass, field
 from typing import Any, Callable, Literal
 import uuid
@@ -12,6 +13,8 @@ class ToolActor(Actor):
     message: ToolMessage | None = field(default=None)
     role: Literal["tool"] = field(default="tool")
     handler: tuple[str, str, Callable[[], ToolCallResult]] | None = field(default=None)
+    concurrent: bool = field(default=False)
+    future: Future[ToolCallResult] | None = field(default=None)
 
     @staticmethod
     def with_message(
@@ -33,10 +36,12 @@ class ToolActor(Actor):
         id: str,
         tool: str,
         handler: Callable[[], ToolCallResult],
+        concurrent: bool = False,
     ) -> "ToolActor":
         return ToolActor(
             turns_allowed=turns_allowed,
             handler=(id, tool, handler),
+            concurrent=concurrent,
         )
 
     @staticmethod
@@ -46,11 +51,13 @@ class ToolActor(Actor):
         tool: str,
         result: Any,
     ) -> "ToolActor":
+        # Named like `ChatHistory.inject_tool_call_result` names its ids
+        tool = f"injected-{tool}-DO-NOT-CALL-YOURSELF-THIS-IS-AUTOMATED"
         return ToolActor(
             turns_allowed=turns_allowed,
             message=ToolMessage(
-                id=str(uuid.uuid4()),
-                tool=f"injected-{tool}-DO-NOT-CALL-YOURSELF-THIS-IS-AUTOMATED",
+                id=f"{tool}-{uuid.uuid4()}",
+                tool=tool,
                 result=ToolCallResult(success=True, error=None, result=result),
             ),
         )
@@ -62,19 +69,28 @@ class ToolActor(Actor):
         tool: str,
         handler: Callable[[], Any],
     ) -> "ToolActor":
+        tool = f"injected-{tool}-DO-NOT-CALL-YOURSELF-THIS-IS-AUTOMATED"
         return ToolActor(
             turns_allowed=turns_allowed,
             handler=(
-                str(uuid.uuid4()),
-                f"injected-{tool}-DO-NOT-CALL-YOURSELF-THIS-IS-AUTOMATED",
+                f"{tool}-{uuid.uuid4()}",
+                tool,
                 lambda: ToolCallResult(success=True, error=None, result=handler()),
             ),
         )
 
+    def submit(self, executor: Executor):
+        if self.message or self.handler is None or not self.concurrent:
+            return
+
+        _, _, handle = self.handler
+        self.future = executor.submit(handle)
+
     def invoke(self):
         if self.message:
             return self.message
 
         assert self.handler is not None
         tool_id, tool, handle = self.handler
-        return ToolMessage(id=tool_id, tool=tool, result=handle())
+        result = self.future.result() if self.future is not None else handle()
+        return ToolMessage(id=tool_id, tool=tool, result=result)
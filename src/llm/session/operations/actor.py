@@ -8,7 +8,7 @@ class ActorOperations:
     state: SessionState
 
     def evict(self, actor: Actor):
-        self.state.evicted_actors.append(actor.id)
+        self.state.evicted_actors.add(actor.id)
 
     def is_evicted(self, actor: Actor):
         return actor.id in self.state.evicted_actors
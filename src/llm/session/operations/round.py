@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 
+from src.llm.history import ChatHistory
 from src.llm.session.actor.user import UserActor
 from src.llm.session.operations.actor import ActorOperations
 from src.llm.session.state import SessionState
@@ -16,15 +17,25 @@ class RoundOperations:
     def on_start(self, *, static_actors: list[Actor]):
         self.actor_ops.enroll_in_new_round(static_actors=static_actors)
 
+        for handler in self.state.round_start_handlers:
+            handler()
+
     def on_end(self):
-        self.state.chat_histories.append(self.state.scoped_chat_history)
+        self.state.chat_histories.append(ChatHistory(self.state.scoped_chat_history))
         self.state.scoped_chat_history.clear()
         self.state.actors.clear()
 
+        if self.state.chat_history_persistence is not None:
+            self.state.chat_history_persistence.on_round_end()
+
+        for handler in self.state.round_end_handlers:
+            handler()
+
 @dataclass
 class InteractiveRoundOperations(RoundOperations):
     def on_start(self, *, static_actors: list[Actor]):
-        super().on_start(static_actors=static_actors)
+        # Prompt first, so the round start handlers only run once the user has submitted it
         static_actors.append(
             UserActor.with_interactive_message(turns_allowed="unlimited")
         )
+        super().on_start(static_actors=static_actors)
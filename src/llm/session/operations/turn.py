@@ -1,4 +1,3 @@
-from datetime import datetime
 from dataclasses import dataclass
 from typing import Callable
 
@@ -11,7 +10,6 @@ from src.llm.session.actor.tool import ToolActor
 from src.llm.session.actor.actor import Actor
 from src.llm.session.actor.user import UserActor
 from src.llm.session.actor.system import SystemActor
-from src.vector_db.client import knowledge_base_client
 
 
 @dataclass
@@ -54,16 +52,34 @@ class TurnOperations:
             self.state.actors.append("end-round")
             return
 
-        self.state.actors.extend(
-            [
-                tool_actor_spawner(tool_call)
-                for tool_call in message.tool_calls
-                if isinstance(tool_call, ChatCompletionMessageFunctionToolCall)
-            ]
-        )
+        tool_actors = [
+            tool_actor_spawner(tool_call)
+            for tool_call in message.tool_calls
+            if isinstance(tool_call, ChatCompletionMessageFunctionToolCall)
+        ]
+        self.submit_ahead(tool_actors)
+        self.state.actors.extend(tool_actors)
+
+    def submit_ahead(self, tool_actors: list[ToolActor]):
+        # Read-only calls run ahead together, but never past a call with side effects, since the model may
+        # depend on it having happened. The ones after it are submitted once it is done
+        if self.state.tool_executor is None:
+            return
+
+        for tool_actor in tool_actors:
+            if tool_actor.message is None and not tool_actor.concurrent:
+                break
+            tool_actor.submit(self.state.tool_executor)
 
     def tool_actor(self, actor: ToolActor):
         message = actor.invoke()
+        if actor.message is None and not actor.concurrent and actor in self.state.actors:
+            following: list[ToolActor] = []
+            for next_actor in self.state.actors[self.state.actors.index(actor) + 1 :]:
+                if not isinstance(next_actor, ToolActor):
+                    break
+                following.append(next_actor)
+            self.submit_ahead(following)
         self.state.scoped_chat_history.append(message.to_dict())
         for tool, handler in self.state.tool_call_handlers:
             if message.tool == tool:
@@ -72,16 +88,5 @@ class TurnOperations:
     def on_turn_end(self, actor: Actor):
         actor.turns_taken += 1
 
-        collection = knowledge_base_client.get_or_create_collection(
-            f"chat-history__session-{self.state.session_id}__created-at-{self.state.created_at}"
-        )
-        collection.upsert(
-            ids=[
-                f"{message['role']}__{datetime.now().isoformat().replace(' ', '').replace(':', '-')}"
-                for message in self.state.scoped_chat_history
-            ],
-            documents=[
-                f"{message['role']}: {message['content']}"
-                for message in self.state.scoped_chat_history
-            ],
-        )
+        if self.state.chat_history_persistence is not None:
+            self.state.chat_history_persistence.persist(self.state.scoped_chat_history)
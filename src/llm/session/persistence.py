@@ -0,0 +1,77 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.constants import CHAT_HISTORY_SUMMARY_COLLECTION
+from src.llm.history import ChatHistory
+from src.vector_db.writer import BatchWriter, WriteError, batch_writer
+
+
+@dataclass
+class ChatHistoryPersistence:
+    collection: str
+    writer: BatchWriter = field(default_factory=lambda: batch_writer)
+    high_water_mark: int = field(default=0)
+    persisted_ids: set[str] = field(default_factory=lambda: set())
+    # Messages whose write failed, sent again with the next ones
+    unwritten: dict[str, str] = field(default_factory=lambda: {})
+    summary_collection: str = field(default=CHAT_HISTORY_SUMMARY_COLLECTION)
+
+    @staticmethod
+    def document(message: dict[str, Any]) -> str:
+        return f"{message['role']}: {message['content']}"
+
+    @staticmethod
+    def message_id(message: dict[str, Any]) -> str:
+        digest = hashlib.sha256(
+            ChatHistoryPersistence.document(message).encode()
+        ).hexdigest()
+        return f"{message['role']}__{digest}"
+
+    def persist(self, history: ChatHistory):
+        messages = history[self.high_water_mark :]
+        # `upsert_system_message` rewrites the head of the history in place
+        if len(history) > 0 and history[0]["role"] == "system":
+            messages.insert(0, history[0])
+        self.high_water_mark = len(history)
+
+        ids = list(self.unwritten.keys())
+        documents = list(self.unwritten.values())
+        self.unwritten.clear()
+        self.persisted_ids.update(ids)
+        for message in messages:
+            message_id = self.message_id(message)
+            if message_id in self.persisted_ids:
+                continue
+
+            self.persisted_ids.add(message_id)
+            ids.append(message_id)
+            documents.append(self.document(message))
+
+        if len(ids) > 0:
+            self.writer.upsert(self.collection, ids=ids, documents=documents)
+
+    def on_round_end(self):
+        self.high_water_mark = 0
+        # Losing part of the record shouldn't end the conversation
+        try:
+            self.writer.flush(self.collection)
+        except WriteError as e:
+            print(f"[CHAT HISTORY] {e}, retrying with the next messages")
+            for request, _ in e.failures:
+                self.persisted_ids.difference_update(request.ids)
+                self.unwritten.update(zip(request.ids, request.documents))
+
+    def save_summary(self, state: dict[str, Any]):
+        self.writer.upsert(
+            self.summary_collection, ids=[self.collection], documents=[json.dumps(state)]
+        )
+
+    def load_summary(self) -> dict[str, Any] | None:
+        self.writer.flush(self.summary_collection)
+        result = self.writer.collections.get(self.summary_collection).get(
+            ids=[self.collection], include=["documents"]
+        )
+        documents = result["documents"] or []
+        return json.loads(documents[0]) if len(documents) > 0 else None
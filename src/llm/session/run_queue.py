@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+from typing import Literal
+
+from src.llm.session.actor.actor import Actor
+
+
+@dataclass
+class ActorRunQueue:
+    # Actors are only ever appended to during a round, so everything before the cursor is done
+    actors: list[Actor | Literal["end-round"]]
+    processed: set[str] = field(default_factory=lambda: set())
+
+    def __post_init__(self):
+        self.cursor = 0
+
+    def skip_processed(self):
+        while (
+            self.cursor < len(self.actors)
+            and self.actors[self.cursor] != "end-round"
+            and self.actors[self.cursor].id in self.processed  # pyright: ignore
+        ):
+            self.cursor += 1
+
+    def next(self) -> Actor | Literal["end-round"] | None:
+        self.skip_processed()
+        if self.cursor == len(self.actors):
+            return None
+        return self.actors[self.cursor]
+
+    def mark_processed(self, actor: Actor):
+        self.processed.add(actor.id)
+
+    def drained(self) -> bool:
+        self.skip_processed()
+        return len(self.actors) > 0 and self.cursor == len(self.actors)
@@ -1,5 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Callable, Literal
+from typing import Callable
 
 from openai.types.chat import ChatCompletionMessageFunctionToolCall
 
@@ -8,6 +9,7 @@ from src.llm.session.operations.actor import ActorOperations
 from src.llm.session.operations.injection import InjectionOperations
 from src.llm.session.operations.operations import SessionOperations
 from src.llm.session.operations.turn import TurnOperations
+from src.llm.session.run_queue import ActorRunQueue
 from src.llm.session.state import SessionState
 from src.llm.session.actor.assistant import AssistantActor
 from src.llm.session.actor.tool import ToolActor
@@ -25,9 +27,10 @@ class Session:
     tool_actor_spawner: (
         Callable[[ChatCompletionMessageFunctionToolCall], ToolActor] | None
     ) = field(default_factory=lambda: None)
+    max_concurrent_tool_calls: int = field(default=1)
 
     def __post_init__(self):
-        self.state = SessionState()
+        self.state = SessionState(tool_executor=self.create_tool_executor())
         self.ops = SessionOperations(
             turn=TurnOperations(state=self.state),
             injection=InjectionOperations(state=self.state),
@@ -35,10 +38,34 @@ class Session:
             round=RoundOperations(state=self.state),
         )
 
+    def create_tool_executor(self):
+        if self.max_concurrent_tool_calls <= 1:
+            return None
+
+        return ThreadPoolExecutor(
+            max_workers=self.max_concurrent_tool_calls,
+            thread_name_prefix="sea-tool-call",
+        )
+
     def start(self):
         assert len(self.static_actors) > 0, (
             "Cannot start chat session with no user prompt and no system prompt..."
         )
+        if self.state.tool_executor is None:
+            self.state.tool_executor = self.create_tool_executor()
+
+        try:
+            self.run()
+        finally:
+            self.close()
+
+    def close(self):
+        # The tool call threads would otherwise live on until the session is garbage collected
+        if self.state.tool_executor is not None:
+            self.state.tool_executor.shutdown(wait=True, cancel_futures=True)
+            self.state.tool_executor = None
+
+    def run(self):
         while True:
             self.ops.round.on_start(static_actors=self.static_actors)
 
@@ -49,23 +76,19 @@ class Session:
                 + self.state.injected_tool_actors
                 + self.state.injected_assistant_actors
             )
-            processed: list[str] = []
+            run_queue = ActorRunQueue(self.state.actors)
 
             while True:
-                actor: Actor | Literal['end-round'] | None = None
-                for _actor in self.state.actors:
-                    if _actor == 'end-round' or _actor.id not in processed:
-                        actor = _actor
-                        break
+                actor = run_queue.next()
 
                 if actor == 'end-round':
                     break
 
                 if actor is not None:
                     self.act(actor)
-                    processed.append(actor.id)
+                    run_queue.mark_processed(actor)
 
-                if len(self.state.actors) > 0 and len(processed) == len(self.state.actors):
+                if run_queue.drained():
                     self.act(self.main_assistant_actor)
 
             self.ops.round.on_end()
@@ -89,7 +112,7 @@ class Session:
 @dataclass
 class InteractiveSession(Session):
     def __post_init__(self):
-        self.state = SessionState()
+        self.state = SessionState(tool_executor=self.create_tool_executor())
         self.ops = SessionOperations(
             turn=TurnOperations(state=self.state),
             injection=InjectionOperations(state=self.state),
@@ -1,27 +1,32 @@
+from concurrent.futures import Executor
 from datetime import datetime
 import uuid
 from dataclasses import dataclass, field
 from typing import Callable, Literal
 
+from src.constants import CHAT_HISTORY_COLLECTION_PREFIX
 from src.llm.evolution import ToolCallResult
 from src.llm.session.actor.assistant import AssistantActor
 from src.llm.session.actor.tool import ToolActor
 from src.llm.session.actor.actor import Actor
 from src.llm.session.actor.system import SystemActor
 from src.llm.history import ChatHistory
+from src.llm.session.persistence import ChatHistoryPersistence
 
 
 @dataclass
 class SessionState:
     chat_histories: list[ChatHistory] = field(default_factory=lambda: [])
     scoped_chat_history: ChatHistory = field(default_factory=lambda: ChatHistory())
-    evicted_actors: list[str] = field(default_factory=lambda: [])
+    evicted_actors: set[str] = field(default_factory=lambda: set())
     injected_tool_actors: list[ToolActor] = field(default_factory=lambda: [])
     injected_assistant_actors: list[AssistantActor] = field(default_factory=lambda: [])
     injected_system_actors: list[SystemActor] = field(default_factory=lambda: [])
     tool_call_handlers: list[tuple[str, Callable[[ToolCallResult], None]]] = field(
         default_factory=lambda: []
     )
+    round_start_handlers: list[Callable[[], None]] = field(default_factory=lambda: [])
+    round_end_handlers: list[Callable[[], None]] = field(default_factory=lambda: [])
     created_at: str = field(
         default_factory=lambda: str(
             datetime.now().isoformat().replace(" ", "").replace(":", "-")
@@ -29,8 +34,22 @@ class SessionState:
     )
     session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
     actors: list[Actor | Literal["end-round"]] = field(default_factory=lambda: [])
+    tool_executor: Executor | None = field(default=None)
+
+    def __post_init__(self):
+        self.chat_history_persistence: ChatHistoryPersistence | None = (
+            ChatHistoryPersistence(
+                collection=f"{CHAT_HISTORY_COLLECTION_PREFIX}session-{self.session_id}__created-at-{self.created_at}"
+            )
+        )
 
     def handle_tool_call_result(
         self, tool: str, handler: Callable[[ToolCallResult], None]
     ):
         self.tool_call_handlers.append((tool, handler))
+
+    def handle_round_start(self, handler: Callable[[], None]):
+        self.round_start_handlers.append(handler)
+
+    def handle_round_end(self, handler: Callable[[], None]):
+        self.round_end_handlers.append(handler)
@@ -47,6 +47,7 @@ def create_tool_actor_spawner():
             id=tool_call.id,
             tool=tool_call.function.name,
             handler=call_tool,
+            concurrent=tool.read_only and not tool.requires_hitl,
         )
 
     return handle
@@ -0,0 +1,220 @@
+import asyncio
+import atexit
+import hashlib
+from concurrent.futures import Future
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from src.constants import (
+    SUMMARIZER_CACHE_CAPACITY,
+    SUMMARIZER_CHUNK_TOKENS,
+    SUMMARIZER_FAN_OUT,
+    SUMMARIZER_LLM,
+    SUMMARIZER_MAX_CONCURRENCY,
+    SUMMARIZER_MERGE_SYSTEM_PROMPT,
+    SUMMARIZER_SYSTEM_PROMPT,
+    SUMMARY_CACHE_PATH,
+)
+from src.llm.client import LLMClient, llm_client
+from src.llm.history import ChatHistory
+from src.llm.session.persistence import ChatHistoryPersistence
+from src.llm.tokens import estimate_tokens, split_by_tokens
+from src.utils import JsonFileCache
+
+summary_cache: JsonFileCache[str] = JsonFileCache(
+    path=SUMMARY_CACHE_PATH, capacity=SUMMARIZER_CACHE_CAPACITY
+)
+atexit.register(summary_cache.save)
+
+
+@dataclass
+class MapReduceSummarizer:
+    llm_client: LLMClient
+    model: str = field(default=SUMMARIZER_LLM)
+    chunk_tokens: int = field(default=SUMMARIZER_CHUNK_TOKENS)
+    fan_out: int = field(default=SUMMARIZER_FAN_OUT)
+    max_concurrency: int = field(default=SUMMARIZER_MAX_CONCURRENCY)
+    cache: JsonFileCache[str] | None = field(default_factory=lambda: summary_cache)
+    on_content_token: Callable[[str], None] = field(default=lambda _: None)
+    on_generation_finish: Callable[[], None] = field(default=lambda: None)
+    # Caps the requests in flight across every summary, not per call, so summarizing many pages at once
+    # can't multiply it. Lives on `llm_client`'s event loop, where all of the summarizing runs
+    slots: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self):
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+
+    def summarize(self, text: str, *, stream: bool = True) -> str:
+        return self.submit(text, stream=stream).result()
+
+    def submit(self, text: str, *, stream: bool = True) -> Future[str]:
+        return self.llm_client.submit(self.asummarize(text, stream=stream))
+
+    async def asummarize(self, text: str, *, stream: bool = True) -> str:
+        chunks = split_by_tokens(text, max_tokens=self.chunk_tokens)
+        if len(chunks) == 0:
+            return ""
+
+        if len(chunks) == 1:
+            return await self.complete(SUMMARIZER_SYSTEM_PROMPT(chunks[0]), stream=stream)
+
+        print(f"[SUMMARIZER] Summarizing {len(chunks)} chunks")
+        summaries = await asyncio.gather(
+            *[self.complete(SUMMARIZER_SYSTEM_PROMPT(chunk)) for chunk in chunks]
+        )
+
+        while len(summaries) > 1:
+            groups = self.group(summaries)
+            print(f"[SUMMARIZER] Merging {len(summaries)} partial summaries into {len(groups)}")
+            summaries = await asyncio.gather(
+                *[
+                    self.complete(SUMMARIZER_MERGE_SYSTEM_PROMPT("\n\n".join(group)))
+                    for group in groups
+                ]
+            )
+
+        return summaries[0]
+
+    def group(self, summaries: list[str]) -> list[list[str]]:
+        groups: list[list[str]] = [[]]
+        group_tokens = 0
+        for summary in summaries:
+            summary_tokens = estimate_tokens(summary)
+            if len(groups[-1]) > 0 and (
+                len(groups[-1]) >= self.fan_out
+                or group_tokens + summary_tokens > self.chunk_tokens
+            ):
+                groups.append([])
+                group_tokens = 0
+
+            groups[-1].append(summary)
+            group_tokens += summary_tokens
+
+        # Always make progress, even if the partial summaries are too long to pair up
+        if len(groups) == len(summaries) and len(summaries) > 1:
+            return [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+
+        return groups
+
+    async def complete(self, prompt: str, *, stream: bool = False) -> str:
+        key = hashlib.sha256(f"{self.model}\0{prompt}".encode()).hexdigest()
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async with self.slots:
+            response = await self.llm_client.astream(
+                model=self.model,
+                chat_history=ChatHistory([{"role": "system", "content": prompt}]),
+            ).process(
+                on_content_token=self.on_content_token if stream else lambda _: None,
+                on_generation_finish=self.on_generation_finish if stream else lambda: None,
+            )
+        summary = response.content or ""
+
+        if self.cache is not None:
+            self.cache.set(key, summary)
+        return summary
+
+
+summarizer = MapReduceSummarizer(
+    llm_client=llm_client,
+    on_content_token=lambda token: print(token, end="", flush=True),
+    on_generation_finish=lambda: print("\n"),
+)
+
+
+@dataclass
+class RollingSummaryRound:
+    new_messages: int
+    tokens_sent: int
+    tokens_saved: int
+
+
+@dataclass
+class RollingSummary:
+    # Saved next to the session's chat history, and picked up again whenever that history is read
+    persistence: ChatHistoryPersistence | None = field(default=None)
+    summary: str = field(default="")
+    summarized_rounds: int = field(default=0)
+    summarized_tokens: int = field(default=0)
+    rounds: list[RollingSummaryRound] = field(default_factory=lambda: [])
+    loaded: bool = field(default=False)
+
+    def load(self):
+        if self.loaded or self.persistence is None:
+            return
+
+        self.loaded = True
+        try:
+            state = self.persistence.load_summary()
+        except Exception:
+            print(f"[ROLLING SUMMARY] Failed to load, starting over\n{traceback.format_exc()}")
+            return
+
+        if state is None:
+            return
+
+        self.summary = state["summary"]
+        self.summarized_rounds = state["summarized_rounds"]
+        self.summarized_tokens = state["summarized_tokens"]
+        self.rounds = [RollingSummaryRound(**round) for round in state["rounds"]]
+
+    def save(self):
+        if self.persistence is None:
+            return
+
+        self.persistence.save_summary(
+            {
+                "summary": self.summary,
+                "summarized_rounds": self.summarized_rounds,
+                "summarized_tokens": self.summarized_tokens,
+                "rounds": [asdict(round) for round in self.rounds],
+            }
+        )
+
+    def update(
+        self,
+        chat_histories: list[ChatHistory],
+        *,
+        summarizer: MapReduceSummarizer = summarizer,
+    ) -> str:
+        self.load()
+        summarized_rounds = len(chat_histories)
+        messages = [
+            f"{message['role']} said: {message['content']}"
+            for history in chat_histories[self.summarized_rounds : summarized_rounds]
+            for message in history
+            if "content" in message
+            and message["content"]
+            and message["role"] != "system"
+        ]
+        if len(messages) == 0:
+            self.summarized_rounds = summarized_rounds
+            return self.summary
+
+        transcript = "\n".join(messages)
+        text = (
+            f"Summary of the conversation so far:\n{self.summary}\n\nWhat was said since:\n{transcript}"
+            if self.summary
+            else transcript
+        )
+
+        # Only advance once the summary is in, so a failed round is folded in again next time
+        self.summary = summarizer.summarize(text)
+        self.summarized_rounds = summarized_rounds
+
+        # Summarizing from scratch would have meant sending every message folded in so far
+        self.summarized_tokens += estimate_tokens(transcript)
+        tokens_sent = estimate_tokens(text)
+        self.rounds.append(
+            RollingSummaryRound(
+                new_messages=len(messages),
+                tokens_sent=tokens_sent,
+                tokens_saved=max(0, self.summarized_tokens - tokens_sent),
+            )
+        )
+        self.save()
+        return self.summary
@@ -0,0 +1,45 @@
+import math
+import re
+
+from src.constants import APPROXIMATE_CHARS_PER_TOKEN
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / APPROXIMATE_CHARS_PER_TOKEN)
+
+
+def split_by_tokens(text: str, *, max_tokens: int) -> list[str]:
+    # Prefer paragraph, then sentence boundaries, only cut through words as a last resort
+    pieces: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            max_chars = int(max_tokens * APPROXIMATE_CHARS_PER_TOKEN)
+            pieces.extend(
+                sentence[start : start + max_chars]
+                for start in range(0, len(sentence), max_chars)
+            )
+
+    chunks: list[str] = []
+    chunk: list[str] = []
+    chunk_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if chunk and chunk_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(chunk))
+            chunk, chunk_tokens = [], 0
+
+        chunk.append(piece)
+        chunk_tokens += piece_tokens
+
+    if chunk:
+        chunks.append("\n\n".join(chunk))
+
+    return chunks
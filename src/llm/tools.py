@@ -1,8 +1,7 @@
-import httpx
-import urllib.parse
+import asyncio
 import json
 import os
-import uuid
+from contextlib import aclosing
 
 from src.llm.session.actor.system import SystemActor
 from src.llm.spawner.tool import create_tool_actor_spawner
@@ -13,15 +12,15 @@ from src.constants import (
     AGENT_LLM,
     DISPATCHED_AGENT_PROMPT,
     EVOLVED_AGENT_DIR,
-    SEARXNG_ENDPOINT,
-    SUMMARIZER_LLM,
-    SUMMARIZER_SYSTEM_PROMPT,
+    MAX_CONCURRENT_TOOL_CALLS,
+    WEB_SEARCH_DEADLINE_SECONDS,
 )
 from src.llm.client import llm_client
 from src.llm.evolution import get_tools_from, tool
 from src.llm.pipeline import SeaConfig, SeaPipeline
-from src.vector_db.client import knowledge_base_client
-from src.utils import html_to_text
+from src.llm.summarizer import summarizer
+from src.vector_db.knowledge_base import knowledge_base
+from src.web.client import web_client
 
 
 @tool
@@ -57,48 +56,54 @@ def search_for_information_on_the_web(
     Returns:
         list[dict[str, str]]: A list of objects of shape {url: <URL>, content: <CONTENT>, title: <TITLE>}
     """
-    query = urllib.parse.quote(query)
-
-    spoofed_user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    r = httpx.get(
-        f"{SEARXNG_ENDPOINT}/search?q={query}&format=json",
-        headers={"User-Agent": spoofed_user_agent},
-    )
-    r.raise_for_status()
-
-    results = r.json().get("results", [])
-
-    contexts: list[dict[str, str]] = []
-
-    visited_index = 0
-    while len(contexts) < min(max_results, len(results)) and visited_index < len(
-        results
-    ):
-        if len(results) == 0:
-            break
-
-        result = results[visited_index]
-        visited_index += 1
+    async def search() -> list[dict[str, str]]:
+        # The limit is only checked after a page is added, which would let one through
+        if max_results <= 0:
+            return []
+
+        results = await web_client.search(query)
+        pages: list[tuple[int, dict[str, str]]] = []
+        summaries: dict[int, asyncio.Task[None]] = {}
+
+        # Pages get summarized as soon as they're extracted, while the rest are still downloading.
+        # The summarizer caps the LLM requests across all of them
+        async def summarize_page(context: dict[str, str]):
+            context["content"] = await asyncio.wrap_future(
+                summarizer.submit(context["content"], stream=False)
+            )
+            print(f"[SUMMARY] [{context['url']}] {context['content']}\n")
 
         try:
-            search_response = httpx.get(result["url"])
-            if search_response.status_code != 200:
-                continue
-
-            html = search_response.text
-            contexts.append(
-                {
-                    "url": result["url"],
-                    "title": result["title"],
-                    "content": summarize.invoke(html_to_text(html))
-                    if should_summarize
-                    else html_to_text(html),
-                }
-            )
-        except Exception:
-            continue
+            async with asyncio.timeout(WEB_SEARCH_DEADLINE_SECONDS):
+                async with aclosing(web_client.fetch_pages(results)) as fetched_pages:
+                    async for page in fetched_pages:
+                        try:
+                            text = await web_client.extract_text(page)
+                        except Exception:
+                            continue
+                        # Nothing to read, e.g. a page rendered by script, must not take one of the results
+                        if not text.strip():
+                            continue
+
+                        context = {"url": page.url, "title": page.title, "content": text}
+                        pages.append((page.rank, context))
+                        if should_summarize:
+                            summaries[page.rank] = asyncio.create_task(summarize_page(context))
+
+                        if len(pages) >= max_results:
+                            break
+        except TimeoutError:
+            pass
+
+        await asyncio.gather(*summaries.values(), return_exceptions=True)
+
+        return [
+            context
+            for rank, context in sorted(pages, key=lambda page: page[0])
+            if rank not in summaries or summaries[rank].exception() is None
+        ]
 
-    return contexts
+    return web_client.run(search())
 
 
 @tool
@@ -107,8 +112,7 @@ def get_available_collections_in_knowledge_base() -> list[str]:
     Returns:
         list[str]: The collections in the knowledge base, available to you.
     """
-    collections = knowledge_base_client.list_collections()
-    return [collection.name for collection in collections]
+    return knowledge_base.collection_names()
 
 
 @tool
@@ -125,8 +129,7 @@ def add_to_knowledge_base(collection: str, info: str) -> None:
             For example, you would use your "things_from_the_web" collection or something to store the data there...
         info (str): The info to add to the knowledge base,
     """
-    c = knowledge_base_client.get_or_create_collection(name=collection)
-    c.upsert(ids=[str(uuid.uuid4())], documents=[info])
+    knowledge_base.add(collection, [info])
 
 
 @tool
@@ -147,10 +150,11 @@ def update_data_in_knowledge_base(
         queries (list[str]): The queries to use in the knowledge base search, so that we can get the entries and update them. Please use multiple queries for a better search result.
         replacement (list[str]): The info to replace the data with.
     """
-    c = knowledge_base_client.get_or_create_collection(name=collection)
-    query_results = c.query(query_texts=queries, include=["documents"])
+    query_results = knowledge_base.query(
+        collection, create=True, query_texts=queries, include=["documents"]
+    )
     doc_id = query_results["ids"][0][0]
-    c.upsert(ids=[doc_id], documents=[replacement])
+    knowledge_base.upsert(collection, ids=[doc_id], documents=[replacement])
 
 
 @tool
@@ -168,14 +172,15 @@ def forget_data_from_knowledge_base(collection: str, queries: list[str]) -> None
             For example, you would use your "things_from_the_web" collection or something to store the data there...
         queries (list[str]): The queries to use in the knowledge base search, so that we can get the entries and delete them. Please use multiple queries for a better search result.,
     """
-    c = knowledge_base_client.get_or_create_collection(name=collection)
-    query_results = c.query(query_texts=queries, include=["documents"])
+    query_results = knowledge_base.query(
+        collection, create=True, query_texts=queries, include=["documents"]
+    )
     ids = [ids for ids_cluster in query_results["ids"] for ids in ids_cluster]
-    c.delete(ids=ids)
+    knowledge_base.delete(collection, ids=ids)
 
 @tool
-def dump_knowledge_base_collection(collection: str):
-    """Tool used to dump information from a collection in your knowledge base.
+def dump_knowledge_base_collection(collection: str, offset: int = 0, limit: int = 50):
+    """Tool used to dump information from a collection in your knowledge base, one page at a time.
     TIP: You can also use this to dump facts that you stored during the current or previous conversations.
     TIP: You can also use this to dump notes that you stored in a `scratchpad` collection over time.
 
@@ -186,11 +191,15 @@ def dump_knowledge_base_collection(collection: str):
             etc...
             NOTE: This is really useful for getting data that you previously searched for, in a summarized manner.
             For example, you would use your "things_from_the_web" collection or something...
+        offset (int): Where to start the page. Pass the `next_offset` of the previous page to continue. Defaults to 0.
+        limit (int): Max documents in the page, the page may hold fewer to fit your context window. Defaults to 50.
+
+    Returns:
+        dict: The page, of shape {documents: <DOCUMENTS>, next_offset: <OFFSET OF THE NEXT PAGE, null AT THE END>, total: <DOCUMENTS IN THE COLLECTION>}
     """
-    c = knowledge_base_client.get_collection(collection)
-    results = c.get()
-    docs = results['documents'] or []
-    return docs
+    page = knowledge_base.dump(collection, offset=offset, limit=limit)
+    return {"documents": page.documents, "next_offset": page.next_offset, "total": page.total}
+
 
 @tool
 def query_knowledge_base(collection: str, queries: list[str], max_results: int = 10):
@@ -209,18 +218,39 @@ def query_knowledge_base(collection: str, queries: list[str], max_results: int =
         max_results (int): Max search results. Defaults to 10.
 
     Returns:
-        list[str]: List of results from the knowledge base
+        list[dict]: The best matching results across all queries, best first, each with its `document` and relevance `score`
     """
-    c = knowledge_base_client.get_collection(collection)
-    query_results = c.query(
-        query_texts=queries, n_results=max_results, include=["documents"]
-    )
+    return [
+        {"document": result.document, "score": round(result.score, 4)}
+        for result in knowledge_base.search(collection, queries, limit=max_results)
+    ]
 
-    doc_cluster = query_results["documents"] or []
-    if len(doc_cluster) == 0:
-        return []
 
-    return [doc for docs in doc_cluster for doc in docs]
+@tool
+def search_knowledge_base(
+    queries: list[str], collections: list[str] | None = None, max_results: int = 10
+):
+    """Tool used to look for information related to the query across every collection in the knowledge base at once.
+    Prefer this over `query_knowledge_base` when you are not sure which collection holds the information.
+
+    Args:
+        queries (list[str]): The queries to use in the knowledge base search. Try to use multiple queries for better results.
+        collections (list[str] | None): Only search these collections. Defaults to searching all of them, except the chat histories of past sessions.
+        max_results (int): Max search results, across all collections. Defaults to 10.
+
+    Returns:
+        list[dict]: The best matching results across all collections, best first, each with its source `collection`, `document` and relevance `score`
+    """
+    return [
+        {
+            "collection": result.collection,
+            "document": result.document,
+            "score": round(result.score, 4),
+        }
+        for result in knowledge_base.search_all(
+            queries, limit=max_results, collections=collections
+        )
+    ]
 
 
 @tool
@@ -244,33 +274,7 @@ def summarize(text: str) -> str:
     Returns:
         str: The summarized text
     """
-    llm_generation_config = LLMGenerationConfig(
-        model=SUMMARIZER_LLM,
-        on_content_token=lambda token: print(token, end="", flush=True),
-        on_generation_finish=lambda: print("\n"),
-    )
-    session = Session(
-        looped=False,
-        static_actors=[
-            SystemActor.with_message(
-                SUMMARIZER_SYSTEM_PROMPT(text),
-            )
-        ],
-        main_assistant_actor=spawn_assistant_actor(
-            llm_client=llm_client,
-            config=llm_generation_config,
-        ),
-    )
-    sea_config = SeaConfig(llm_client=llm_client, session=session)
-    chat_histories = SeaPipeline(config=sea_config).run()
-
-    if len(chat_histories) == 0:
-        return ""
-
-    if len(chat_histories[-1]) == 0:
-        return ""
-
-    return chat_histories[-1][-1]["content"]
+    return summarizer.summarize(text)
 
 
 @tool
@@ -455,6 +459,7 @@ def dispatch_agent(
             tools_factory=lambda: tools,
         ),
         tool_actor_spawner=create_tool_actor_spawner(),
+        max_concurrent_tool_calls=MAX_CONCURRENT_TOOL_CALLS,
     )
     sea_config = SeaConfig(llm_client=llm_client, session=session)
     chat_histories = SeaPipeline(config=sea_config).run()
@@ -466,3 +471,11 @@ categorize_prompt.standalone = True
 add_to_knowledge_base.requires_hitl = True
 register_agent.requires_hitl = True
 dispatch_agent.requires_hitl = True
+search_for_information_on_the_web.read_only = True
+get_available_collections_in_knowledge_base.read_only = True
+dump_knowledge_base_collection.read_only = True
+query_knowledge_base.read_only = True
+search_knowledge_base.read_only = True
+get_available_agents.read_only = True
+summarize.read_only = True
+retrieve_agent_implementation.read_only = True
@@ -13,6 +13,9 @@ SEMANTIC_ROUTER_TARGETS: list[SemanticRouterTarget] = [
     "agentic",
 ]
 
+ContextTrimPolicy = Literal["compact"] | Literal["summarize"] | Literal["drop"]
+PromptLayout = Literal["as-is"] | Literal["stable-prefix"]
+
 
 @dataclass
 class LLMGenerationConfig:
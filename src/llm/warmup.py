@@ -0,0 +1,45 @@
+import asyncio
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from src.constants import LLM_WARM_UP_PROMPT
+from src.llm.client import LLMClient
+from src.llm.history import ChatHistory
+
+
+@dataclass
+class ModelWarmer:
+    llm_client: LLMClient
+
+    def __post_init__(self):
+        self.future: Future[None] | None = None
+
+    def warm_up(self, model: str, *, after: list[Future] = []):
+        self.cancel()
+        self.future = self.llm_client.submit(self.awarm_up(model, after=after))
+
+    async def awarm_up(self, model: str, *, after: list[Future] = []):
+        # Let the background work of the previous round go first, it would swap the model right back
+        for future in after:
+            try:
+                await asyncio.shield(asyncio.wrap_future(future))
+            except Exception:
+                pass
+
+        scheduler = self.llm_client.scheduler
+        if scheduler.resolve(model) == scheduler.resident:
+            return
+
+        start = time.perf_counter()
+        await self.llm_client.astream(
+            model=model,
+            chat_history=ChatHistory([{"role": "user", "content": LLM_WARM_UP_PROMPT}]),
+            max_tokens=1,
+        ).process(on_generation_finish=lambda: None)
+        print(f"[WARM-UP] Loaded `{model}` in {time.perf_counter() - start:.2f}s")
+
+    def cancel(self):
+        if self.future is not None and self.future.cancel():
+            print("[WARM-UP] Cancelled")
+        self.future = None
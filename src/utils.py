@@ -1,9 +1,16 @@
-import readability
-from bs4 import BeautifulSoup
-from typing import Any, Callable, Generator, Generic, TypeVar
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Generator, Generic, TypeVar
+
+from src.constants import HTML_TO_TEXT_MAX_INPUT_BYTES, HTML_TO_TEXT_MAX_OUTPUT_CHARS
 
 TYield = TypeVar("TYield")
 TReturn = TypeVar("TReturn")
+TValue = TypeVar("TValue")
 
 
 class StatefulGenerator(Generic[TYield, TReturn]):
@@ -20,19 +27,219 @@ class StatefulGenerator(Generic[TYield, TReturn]):
         return self
 
 
+class BackgroundEventLoop:
+    def __init__(self, *, name: str):
+        self.name = name
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.lock = threading.Lock()
+
+    def submit(self, coro: Coroutine[Any, Any, TReturn]) -> Future[TReturn]:
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self.loop.run_forever, name=self.name, daemon=True
+                ).start()
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, TReturn]) -> TReturn:
+        return self.submit(coro).result()
+
+
+class Lazy(Generic[TValue]):
+    # Builds the wrapped singleton on first use, so importing its module stays cheap
+    def __init__(self, factory: Callable[[], TValue]):
+        self.factory = factory
+        self.value: TValue | None = None
+        self.lock = threading.Lock()
+
+    def get(self) -> TValue:
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.factory()
+        return self.value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.get()(*args, **kwargs)  # pyright: ignore
+
+
+class JsonFileCache(Generic[TValue]):
+    def __init__(self, *, path: str, capacity: int | None = None):
+        self.path = path
+        self.capacity = capacity
+        self.entries: OrderedDict[str, TValue] | None = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self) -> OrderedDict[str, TValue]:
+        if self.entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = OrderedDict(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                self.entries = OrderedDict()
+        return self.entries
+
+    def get(self, key: str) -> TValue | None:
+        with self.lock:
+            entries = self.load()
+            if key not in entries:
+                return None
+
+            entries.move_to_end(key)
+            # The recency order decides what gets evicted, so it is worth persisting too
+            self.dirty = True
+            return entries[key]
+
+    def set(self, key: str, value: TValue) -> int:
+        with self.lock:
+            entries = self.load()
+            entries[key] = value
+            entries.move_to_end(key)
+            evicted = 0
+            while self.capacity is not None and len(entries) > self.capacity:
+                entries.popitem(last=False)
+                evicted += 1
+            self.dirty = True
+            return evicted
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.entries is None:
+                return
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+def path_fingerprint(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 def consume_generator(g: Generator):
     for _ in g:
         pass
 
 
-def html_to_text(html: str) -> str:
-    doc = readability.Document(html)
-    parsed_html = doc.summary()
+# Never content. Form controls go, but not the form itself: some sites wrap the whole page in one
+BOILERPLATE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "iframe",
+    "svg",
+    "canvas",
+    "button",
+    "select",
+    "textarea",
+]
+# Page chrome, unless it sits inside the main content (an article's own header) or holds it
+LAYOUT_TAGS = ["nav", "header", "footer", "aside"]
+CONTENT_TAGS = ["html", "body", "article", "main"]
+# Matched against whole class and id tokens, so a `container has-sidebar` wrapper doesn't count
+BOILERPLATE_TOKENS = {
+    "comment",
+    "comments",
+    "sidebar",
+    "footer",
+    "nav",
+    "navbar",
+    "menu",
+    "breadcrumb",
+    "breadcrumbs",
+    "cookie",
+    "cookies",
+    "share",
+    "social",
+    "related",
+    "advert",
+    "ads",
+    "banner",
+    "popup",
+    "modal",
+}
+MAIN_CONTENT = "//article | //main | //*[@role='main']"
+
+
+def html_to_text(
+    html: str | bytes,
+    *,
+    max_input_bytes: int = HTML_TO_TEXT_MAX_INPUT_BYTES,
+    max_output_chars: int = HTML_TO_TEXT_MAX_OUTPUT_CHARS,
+) -> str:
+    import lxml.etree
+    import lxml.html
+
+    raw = html.encode("utf-8", errors="ignore") if isinstance(html, str) else html
+    raw = raw[:max_input_bytes]
+    if len(raw.strip()) == 0:
+        return ""
+
+    try:
+        doc = lxml.html.fromstring(
+            raw, parser=lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+        )
+    except (lxml.etree.ParserError, ValueError):
+        return ""
+
+    for element in list(doc.iter(*BOILERPLATE_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    page_length = len(doc.text_content())
+
+    def holds_main_content(element) -> bool:
+        if element.tag in CONTENT_TAGS or element.getparent() is None:
+            return True
+        if len(element.xpath(".//article | .//main | .//*[@role='main']")) > 0:
+            return True
+        # A wrapper around most of the page is the content, whatever it is called
+        return len(element.text_content()) > page_length / 2
+
+    for element in list(doc.iter(*LAYOUT_TAGS)):
+        inside_content = any(ancestor.tag in ["article", "main"] for ancestor in element.iterancestors())
+        if not inside_content and not holds_main_content(element):
+            element.drop_tree()
+    for element in doc.xpath("//*[@class or @id or @role]"):
+        tokens = {
+            token.lower()
+            for token in f"{element.get('class', '')} {element.get('id', '')} {element.get('role', '')}".split()
+        }
+        if tokens.isdisjoint(BOILERPLATE_TOKENS) or holds_main_content(element):
+            continue
+
+        element.drop_tree()
+
+    roots = doc.xpath(MAIN_CONTENT)
+    root = max(roots, key=lambda r: len(r.text_content())) if roots else doc
+
+    chunks: list[str] = []
+    length = 0
+    for chunk in root.itertext():
+        chunk = " ".join(chunk.split())
+        if not chunk:
+            continue
 
-    soup = BeautifulSoup(parsed_html, "html.parser")
-    text = soup.get_text(separator=" ", strip=True)
+        chunks.append(chunk)
+        length += len(chunk) + 1
+        if length >= max_output_chars:
+            break
 
-    return text
+    return " ".join(chunks)[:max_output_chars]
 
 T = TypeVar('T')
 R = TypeVar('R')
@@ -0,0 +1,48 @@
+import json
+from typing import Any, cast
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings, Space
+
+from src.vector_db.embedding_cache import EmbedFunction, EmbeddingCache, embedding_cache
+from src.vector_db.embeddings import embedding_function
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    # Presents itself to chroma as the wrapped function, so existing collections keep opening without a conflict
+    def __init__(self, embedding_function: EmbeddingFunction[Documents], cache: EmbeddingCache = embedding_cache):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        # Chroma's vectors are numpy arrays, which the cache stores as they are
+        self.embed = cast(EmbedFunction, embedding_function)
+        self.embed_query_function = cast(EmbedFunction, embedding_function.embed_query)
+        # Vectors from different models or settings never mix
+        self.namespace = f"{embedding_function.name()}:{json.dumps(embedding_function.get_config(), sort_keys=True, default=str)}"
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.cache.get_or_embed(input, namespace=self.namespace, embed=self.embed)
+
+    def embed_query(self, input: Documents) -> Embeddings:
+        # Only models that embed queries differently from documents need their own entries for them
+        if type(self.embedding_function).embed_query is EmbeddingFunction.embed_query:
+            return self(input)
+
+        return self.cache.get_or_embed(
+            input, namespace=f"{self.namespace}:query", embed=self.embed_query_function
+        )
+
+    def name(self) -> str:  # pyright: ignore
+        return self.embedding_function.name()
+
+    def get_config(self) -> dict[str, Any]:
+        return self.embedding_function.get_config()
+
+    def default_space(self) -> Space:
+        return self.embedding_function.default_space()
+
+    def supported_spaces(self) -> list[Space]:
+        return self.embedding_function.supported_spaces()
+
+    @staticmethod
+    def build_from_config(config: dict[str, Any]) -> "CachedEmbeddingFunction":
+        # The config is the wrapped function's, and the knowledge base only ever wraps its own model
+        return CachedEmbeddingFunction(type(embedding_function.get()).build_from_config(config))
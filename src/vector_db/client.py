@@ -1,4 +1,16 @@
+from typing import TYPE_CHECKING
+
 from src.constants import EVOLVED_KNOWLEDGE_BASE_DIR
-import chromadb
+from src.utils import Lazy
+
+if TYPE_CHECKING:
+    from chromadb.api import ClientAPI
+
+
+def create_knowledge_base_client() -> "ClientAPI":
+    import chromadb
+
+    return chromadb.PersistentClient(path=EVOLVED_KNOWLEDGE_BASE_DIR)
+
 
-knowledge_base_client = chromadb.PersistentClient(path=EVOLVED_KNOWLEDGE_BASE_DIR)
+knowledge_base_client: Lazy["ClientAPI"] = Lazy(create_knowledge_base_client)
@@ -0,0 +1,48 @@
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from src.utils import Lazy
+from src.vector_db.client import knowledge_base_client
+from src.vector_db.embeddings import knowledge_base_embedding_function
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+    from chromadb.api.types import EmbeddingFunction
+
+
+@dataclass
+class CollectionCache:
+    client: Any = field(default_factory=lambda: knowledge_base_client)
+    embedding_function: "EmbeddingFunction | Lazy[EmbeddingFunction] | None" = field(default=None)
+
+    def __post_init__(self):
+        self.collections: dict[str, "Collection"] = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str, *, create: bool = True) -> "Collection":
+        collection = self.collections.get(name)
+        if collection is not None:
+            return collection
+
+        embedding_function = (
+            self.embedding_function.get()
+            if isinstance(self.embedding_function, Lazy)
+            else self.embedding_function
+        )
+        options: dict[str, Any] = (
+            {"embedding_function": embedding_function} if embedding_function is not None else {}
+        )
+        collection = (
+            self.client.get_or_create_collection(name, **options)
+            if create
+            else self.client.get_collection(name, **options)
+        )
+        with self.lock:
+            return self.collections.setdefault(name, collection)
+
+    def names(self) -> list[str]:
+        return [collection.name for collection in self.client.list_collections()]
+
+
+collection_cache = CollectionCache(embedding_function=knowledge_base_embedding_function)
@@ -0,0 +1,182 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Literal, Sequence
+
+import numpy as np
+
+from src.constants import EMBEDDING_CACHE_CAPACITY, EMBEDDING_CACHE_DIR
+
+KEY_BYTES = 32
+
+# The same shape as the semantic router's embedding function
+EmbedFunction = Callable[[list[str]], Sequence[Sequence[float]]]
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = field(default=0)
+    misses: int = field(default=0)
+    evictions: int = field(default=0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class EmbeddingCache:
+    # Vectors live in a memory-mapped array, one slot per text, next to each slot's content hash.
+    # The index only maps hashes to slots in LRU order, slots it doesn't vouch for are treated as free
+    path: str
+    capacity: int = field(default=EMBEDDING_CACHE_CAPACITY)
+
+    def __post_init__(self):
+        self.index: OrderedDict[bytes, int] | None = None
+        self.records: np.memmap | None = None
+        self.dimensions: int | None = None
+        self.free_slots: list[int] = []
+        self.stats = EmbeddingCacheStats()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.bin")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    @staticmethod
+    def key(text: str, *, namespace: str) -> bytes:
+        return hashlib.sha256(f"{namespace}\0{text}".encode()).digest()
+
+    def record_dtype(self, dimensions: int) -> np.dtype:
+        return np.dtype([("key", np.uint8, (KEY_BYTES,)), ("vector", np.float32, (dimensions,))])
+
+    def open_records(self, dimensions: int, *, mode: Literal["r+", "w+"]) -> np.memmap:
+        os.makedirs(self.path, exist_ok=True)
+        return np.memmap(
+            self.vectors_path, dtype=self.record_dtype(dimensions), mode=mode, shape=(self.capacity,)
+        )
+
+    def load(self) -> OrderedDict[bytes, int]:
+        if self.index is not None:
+            return self.index
+
+        self.index = OrderedDict()
+        try:
+            with open(self.index_path, "r") as f:
+                saved = json.load(f)
+            dimensions = int(saved["dimensions"])
+            expected_size = self.record_dtype(dimensions).itemsize * self.capacity
+            if os.path.getsize(self.vectors_path) != expected_size:
+                raise ValueError("the cache was written with a different capacity")
+
+            records = self.open_records(dimensions, mode="r+")
+            for key_hex, slot in saved["entries"]:
+                key = bytes.fromhex(key_hex)
+                # A slot reused after the last save holds another text now
+                if 0 <= slot < self.capacity and records[slot]["key"].tobytes() == key:
+                    self.index[key] = slot
+
+            self.records = records
+            self.dimensions = dimensions
+        except (OSError, ValueError, KeyError, TypeError, json.JSONDecodeError):
+            self.index.clear()
+
+        used = set(self.index.values())
+        self.free_slots = [slot for slot in reversed(range(self.capacity)) if slot not in used]
+        return self.index
+
+    def lookup(self, keys: Sequence[bytes]) -> dict[bytes, np.ndarray]:
+        with self.lock:
+            index = self.load()
+            found: dict[bytes, np.ndarray] = {}
+            for key in keys:
+                slot = index.get(key)
+                if slot is None or self.records is None:
+                    self.stats.misses += 1
+                    continue
+
+                index.move_to_end(key)
+                found[key] = np.array(self.records[slot]["vector"])
+                self.stats.hits += 1
+            return found
+
+    def store(self, entries: dict[bytes, np.ndarray]):
+        with self.lock:
+            index = self.load()
+            for key, vector in entries.items():
+                if self.records is None:
+                    self.dimensions = len(vector)
+                    self.records = self.open_records(self.dimensions, mode="w+")
+                if len(vector) != self.dimensions:
+                    continue
+
+                slot = index.pop(key, None)
+                if slot is None and len(self.free_slots) > 0:
+                    slot = self.free_slots.pop()
+                if slot is None:
+                    _, slot = index.popitem(last=False)
+                    self.stats.evictions += 1
+
+                self.records[slot]["vector"] = vector
+                self.records[slot]["key"] = np.frombuffer(key, dtype=np.uint8)
+                index[key] = slot
+                self.dirty = True
+
+    def get_or_embed(
+        self,
+        texts: Sequence[str],
+        *,
+        namespace: str,
+        embed: EmbedFunction,
+    ) -> list[np.ndarray]:
+        keys = [self.key(text, namespace=namespace) for text in texts]
+        # Repeats within the same call only count, and get embedded, once
+        unique_keys = list(dict.fromkeys(keys))
+        vectors = self.lookup(unique_keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if len(missing) > 0:
+            embedded = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), embed(list(missing.values())))
+            }
+            self.store(embedded)
+            vectors.update(embedded)
+
+        return [vectors[key] for key in keys]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.load())
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.index is None or self.records is None:
+                return
+
+            self.records.flush()
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "dimensions": self.dimensions,
+                        "entries": [[key.hex(), slot] for key, slot in self.index.items()],
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+
+embedding_cache = EmbeddingCache(path=EMBEDDING_CACHE_DIR)
+atexit.register(embedding_cache.save)
@@ -0,0 +1,24 @@
+from typing import TYPE_CHECKING
+
+from src.utils import Lazy
+
+if TYPE_CHECKING:
+    from chromadb.api.types import EmbeddingFunction
+
+
+def create_embedding_function() -> "EmbeddingFunction":
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+    return DefaultEmbeddingFunction()
+
+
+def create_knowledge_base_embedding_function() -> "EmbeddingFunction":
+    from src.vector_db.cached_embeddings import CachedEmbeddingFunction
+
+    return CachedEmbeddingFunction(embedding_function.get())
+
+
+embedding_function: Lazy["EmbeddingFunction"] = Lazy(create_embedding_function)
+knowledge_base_embedding_function: Lazy["EmbeddingFunction"] = Lazy(
+    create_knowledge_base_embedding_function
+)
@@ -0,0 +1,360 @@
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterator
+
+from src.constants import (
+    APPROXIMATE_CHARS_PER_TOKEN,
+    CHAT_HISTORY_COLLECTION_PREFIX,
+    KNOWLEDGE_BASE_DUMP_PAGE_BYTES,
+    KNOWLEDGE_BASE_DUMP_PAGE_SIZE,
+    KNOWLEDGE_BASE_DUMP_PAGE_TOKENS,
+    KNOWLEDGE_BASE_LEXICAL_INDEX_CAPACITY,
+    KNOWLEDGE_BASE_READ_BATCH_SIZE,
+    KNOWLEDGE_BASE_SEARCH_CANDIDATES,
+    KNOWLEDGE_BASE_SEARCH_WORKERS,
+    KNOWLEDGE_BASE_TRUNCATION_MARKER,
+    KNOWLEDGE_BASE_WRITE_BUFFER_SIZE,
+    RECIPROCAL_RANK_FUSION_K,
+)
+from src.llm.tokens import estimate_tokens
+from src.vector_db.collections import CollectionCache, collection_cache
+from src.vector_db.embeddings import embedding_function
+from src.vector_db.lexical import LexicalIndex
+from src.vector_db.writer import BatchWriter, UpsertRequest, batch_writer
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+    from chromadb.api.types import Embeddings, GetResult, QueryResult
+
+knowledge_search_executor = ThreadPoolExecutor(
+    max_workers=KNOWLEDGE_BASE_SEARCH_WORKERS, thread_name_prefix="sea-knowledge-search"
+)
+
+
+@dataclass
+class KnowledgeSearchResult:
+    collection: str
+    id: str
+    document: str
+    score: float
+
+
+@dataclass
+class KnowledgeBasePage:
+    collection: str
+    documents: list[str]
+    offset: int
+    # None once the collection is exhausted
+    next_offset: int | None
+    total: int
+
+
+def clip_document(document: str, *, max_bytes: int, max_tokens: int) -> str:
+    if len(document.encode()) <= max_bytes and estimate_tokens(document) <= max_tokens:
+        return document
+
+    budget_bytes = max_bytes - len(KNOWLEDGE_BASE_TRUNCATION_MARKER.encode())
+    budget_chars = int(max_tokens * APPROXIMATE_CHARS_PER_TOKEN) - len(KNOWLEDGE_BASE_TRUNCATION_MARKER)
+    clipped = document.encode()[: max(budget_bytes, 0)].decode(errors="ignore")
+    return clipped[: max(budget_chars, 0)] + KNOWLEDGE_BASE_TRUNCATION_MARKER
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[str]], *, k: int = RECIPROCAL_RANK_FUSION_K
+) -> list[tuple[str, float]]:
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            scores[id] = scores.get(id, 0.0) + 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+@dataclass
+class KnowledgeBase:
+    collections: CollectionCache = field(default_factory=lambda: collection_cache)
+    writer: BatchWriter = field(default_factory=lambda: batch_writer)
+    buffer_size: int = field(default=KNOWLEDGE_BASE_WRITE_BUFFER_SIZE)
+    executor: Executor = field(default_factory=lambda: knowledge_search_executor)
+    lexical_index_capacity: int = field(default=KNOWLEDGE_BASE_LEXICAL_INDEX_CAPACITY)
+
+    def __post_init__(self):
+        self.pending: dict[str, dict[str, str]] = {}
+        self.pending_documents = 0
+        self.lock = threading.Lock()
+        self.lexical_indexes: OrderedDict[str, LexicalIndex] = OrderedDict()
+        self.index_locks: dict[str, threading.Lock] = {}
+        self.writer.handle_write(self.on_write)
+
+    @staticmethod
+    def document_id(document: str) -> str:
+        # Adding the same fact twice coalesces into a single document
+        return hashlib.sha256(document.encode()).hexdigest()
+
+    def add(self, collection: str, documents: list[str]) -> list[str]:
+        ids = [self.document_id(document) for document in documents]
+        self.upsert(collection, ids=ids, documents=documents)
+        return ids
+
+    def upsert(self, collection: str, *, ids: list[str], documents: list[str]):
+        with self.lock:
+            pending = self.pending.setdefault(collection, {})
+            pending_before = len(pending)
+            pending.update(zip(ids, documents))
+            self.pending_documents += len(pending) - pending_before
+            full = self.pending_documents >= self.buffer_size
+
+        if full:
+            self.write_behind()
+
+    def write_behind(self, collection: str | None = None):
+        # Hands the buffered documents over to the writer without waiting for them to land
+        with self.lock:
+            names = [
+                name for name in self.pending if collection is None or name == collection
+            ]
+            batches = [(name, self.pending.pop(name)) for name in names]
+            self.pending_documents -= sum(len(documents) for _, documents in batches)
+
+        for name, documents in batches:
+            self.writer.upsert(
+                name, ids=list(documents.keys()), documents=list(documents.values())
+            )
+
+    def flush(self, collection: str | None = None):
+        # Reads call this first, so they always see the writes that came before them
+        self.write_behind(collection)
+        self.writer.flush(collection)
+
+    def collection(self, name: str, *, create: bool = False) -> "Collection":
+        self.flush(name)
+        return self.collections.get(name, create=create)
+
+    def query(self, collection: str, *, create: bool = False, **kwargs: Any) -> "QueryResult":
+        return self.collection(collection, create=create).query(**kwargs)
+
+    def get(self, collection: str, *, create: bool = False, **kwargs: Any) -> "GetResult":
+        return self.collection(collection, create=create).get(**kwargs)
+
+    def delete(self, collection: str, *, ids: list[str], create: bool = False):
+        if len(ids) == 0:
+            return
+
+        self.collection(collection, create=create).delete(ids=ids)
+        index = self.lexical_indexes.get(collection)
+        if index is not None:
+            index.remove(ids)
+
+    def on_write(self, request: UpsertRequest):
+        index = self.lexical_indexes.get(request.collection)
+        if index is not None:
+            index.add(request.ids, request.documents)
+
+    def lexical_index(self, collection: str) -> LexicalIndex:
+        # Built from the collection the first time it is searched, the writer keeps it up to date after that
+        with self.lock:
+            index_lock = self.index_locks.setdefault(collection, threading.Lock())
+
+        with index_lock:
+            with self.lock:
+                index = self.lexical_indexes.get(collection)
+                if index is not None:
+                    self.lexical_indexes.move_to_end(collection)
+                    return index
+
+                index = LexicalIndex()
+                self.lexical_indexes[collection] = index
+                # An evicted index is rebuilt from its collection the next time it is searched
+                while len(self.lexical_indexes) > self.lexical_index_capacity:
+                    self.lexical_indexes.popitem(last=False)
+
+            # Writes that landed since the read started are newer, don't overwrite them
+            for ids, documents in self.iter_batches(collection):
+                index.add(ids, documents, replace=False)
+            return index
+
+    def search(
+        self,
+        collection: str,
+        queries: list[str],
+        *,
+        limit: int,
+        candidates: int = KNOWLEDGE_BASE_SEARCH_CANDIDATES,
+        query_embeddings: "Embeddings | None" = None,
+    ) -> list[KnowledgeSearchResult]:
+        handle = self.collection(collection)
+        count = handle.count()
+        if count == 0 or len(queries) == 0:
+            return []
+
+        # Dense search is good at paraphrases, lexical search at names, dates and identifiers
+        depth = min(count, max(limit, candidates))
+        dense = (
+            handle.query(query_embeddings=query_embeddings, n_results=depth, include=["documents"])
+            if query_embeddings is not None
+            else handle.query(query_texts=queries, n_results=depth, include=["documents"])
+        )
+        documents: dict[str, str] = {
+            id: document
+            for ids, cluster in zip(dense["ids"], dense["documents"] or [])
+            for id, document in zip(ids, cluster)
+        }
+        index = self.lexical_index(collection)
+        rankings = [
+            *[list(ids) for ids in dense["ids"]],
+            *[[id for id, _ in index.search(query, limit=depth)] for query in queries],
+        ]
+        fused = reciprocal_rank_fusion(rankings)[:depth]
+
+        missing = [id for id, _ in fused if id not in documents]
+        if len(missing) > 0:
+            lexical_only = handle.get(ids=missing, include=["documents"])
+            documents.update(zip(lexical_only["ids"], lexical_only["documents"] or []))
+
+        results: list[KnowledgeSearchResult] = []
+        seen_documents: set[str] = set()
+        for id, score in fused:
+            document = documents.get(id)
+            if document is None or document in seen_documents:
+                continue
+
+            seen_documents.add(document)
+            results.append(
+                KnowledgeSearchResult(collection=collection, id=id, document=document, score=score)
+            )
+            if len(results) == limit:
+                break
+
+        return results
+
+    def search_all(
+        self,
+        queries: list[str],
+        *,
+        limit: int,
+        collections: list[str] | None = None,
+    ) -> list[KnowledgeSearchResult]:
+        names = self.collection_names()
+        # Past sessions' chat histories would crowd out the knowledge, and each would cost a lexical index
+        names = (
+            [name for name in names if name in collections]
+            if collections is not None
+            else [name for name in names if not name.startswith(CHAT_HISTORY_COLLECTION_PREFIX)]
+        )
+        if len(names) == 0 or len(queries) == 0:
+            return []
+
+        # Every collection shares the embedding function, so the queries only need embedding once
+        query_embeddings = (self.collections.embedding_function or embedding_function)(queries)
+        futures = [
+            self.executor.submit(
+                self.search, name, queries, limit=limit, query_embeddings=query_embeddings
+            )
+            for name in names
+        ]
+        # Fusion scores only depend on ranks, so they compare across collections as they are
+        ranked = sorted(
+            (result for future in futures for result in future.result()),
+            key=lambda result: result.score,
+            reverse=True,
+        )
+
+        results: list[KnowledgeSearchResult] = []
+        seen_documents: set[str] = set()
+        for result in ranked:
+            if result.document in seen_documents:
+                continue
+
+            seen_documents.add(result.document)
+            results.append(result)
+            if len(results) == limit:
+                break
+
+        return results
+
+    def iter_batches(
+        self,
+        collection: str,
+        *,
+        offset: int = 0,
+        batch_size: int = KNOWLEDGE_BASE_READ_BATCH_SIZE,
+    ) -> Iterator[tuple[list[str], list[str]]]:
+        # Streams the collection in bounded batches instead of loading all of it at once
+        handle = self.collection(collection)
+        while True:
+            batch = handle.get(limit=batch_size, offset=offset, include=["documents"])
+            if len(batch["ids"]) == 0:
+                return
+
+            yield batch["ids"], batch["documents"] or []
+            offset += len(batch["ids"])
+            if len(batch["ids"]) < batch_size:
+                return
+
+    def iter_documents(
+        self,
+        collection: str,
+        *,
+        offset: int = 0,
+        batch_size: int = KNOWLEDGE_BASE_READ_BATCH_SIZE,
+    ) -> Iterator[tuple[str, str]]:
+        for ids, documents in self.iter_batches(collection, offset=offset, batch_size=batch_size):
+            yield from zip(ids, documents)
+
+    def dump(
+        self,
+        collection: str,
+        *,
+        offset: int = 0,
+        limit: int = KNOWLEDGE_BASE_DUMP_PAGE_SIZE,
+        max_bytes: int = KNOWLEDGE_BASE_DUMP_PAGE_BYTES,
+        max_tokens: int = KNOWLEDGE_BASE_DUMP_PAGE_TOKENS,
+    ) -> KnowledgeBasePage:
+        total = self.collection(collection).count()
+        offset = max(offset, 0)
+        documents: list[str] = []
+        page_bytes = 0
+        page_tokens = 0
+
+        batch_size = min(max(limit, 1), KNOWLEDGE_BASE_READ_BATCH_SIZE)
+        for _, document in self.iter_documents(collection, offset=offset, batch_size=batch_size):
+            document_bytes = len(document.encode())
+            document_tokens = estimate_tokens(document)
+            if len(documents) > 0 and (
+                page_bytes + document_bytes > max_bytes or page_tokens + document_tokens > max_tokens
+            ):
+                break
+
+            # A document over the cap on its own still gets a page, clipped, so paging always advances
+            document = clip_document(document, max_bytes=max_bytes, max_tokens=max_tokens)
+            documents.append(document)
+            page_bytes += len(document.encode())
+            page_tokens += estimate_tokens(document)
+            if len(documents) >= limit:
+                break
+
+        next_offset = offset + len(documents)
+        return KnowledgeBasePage(
+            collection=collection,
+            documents=documents,
+            offset=offset,
+            next_offset=next_offset if next_offset < total and len(documents) > 0 else None,
+            total=total,
+        )
+
+    def settle(self):
+        # Lands every buffered write, so new collections show up. Their failures aren't raised here, they wait
+        # for whoever reads or flushes those collections
+        self.write_behind()
+        self.writer.wait()
+
+    def collection_names(self) -> list[str]:
+        self.settle()
+        return self.collections.names()
+
+
+knowledge_base = KnowledgeBase()
+atexit.register(knowledge_base.flush)
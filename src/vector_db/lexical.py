@@ -0,0 +1,86 @@
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from src.constants import BM25_B, BM25_K1
+
+# Plain words, plus compound tokens so identifiers, dates and paths also match as a whole.
+# Compounds only start at a word boundary, otherwise a long word backtracks from every position in it
+WORD = re.compile(r"\w+")
+COMPOUND = re.compile(r"(?<!\w)\w+(?:[-_./:@]\w+)+")
+
+
+def tokenize(text: str) -> list[str]:
+    text = text.lower()
+    return WORD.findall(text) + COMPOUND.findall(text)
+
+
+@dataclass
+class LexicalIndex:
+    k1: float = field(default=BM25_K1)
+    b: float = field(default=BM25_B)
+
+    def __post_init__(self):
+        self.postings: dict[str, dict[str, int]] = {}
+        self.lengths: dict[str, int] = {}
+        self.tokens: dict[str, list[str]] = {}
+        self.total_length = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, ids: list[str], documents: list[str], *, replace: bool = True):
+        with self.lock:
+            for id, document in zip(ids, documents):
+                if id in self.lengths and not replace:
+                    continue
+
+                self.remove_locked(id)
+                frequencies = Counter(tokenize(document))
+                for token, frequency in frequencies.items():
+                    self.postings.setdefault(token, {})[id] = frequency
+                self.lengths[id] = sum(frequencies.values())
+                self.tokens[id] = list(frequencies)
+                self.total_length += self.lengths[id]
+
+    def remove(self, ids: list[str]):
+        with self.lock:
+            for id in ids:
+                self.remove_locked(id)
+
+    def remove_locked(self, id: str):
+        length = self.lengths.pop(id, None)
+        if length is None:
+            return
+
+        self.total_length -= length
+        for token in self.tokens.pop(id):
+            del self.postings[token][id]
+            if len(self.postings[token]) == 0:
+                del self.postings[token]
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, float]]:
+        with self.lock:
+            if len(self.lengths) == 0:
+                return []
+
+            average_length = self.total_length / len(self.lengths)
+            scores: dict[str, float] = {}
+            for token in set(tokenize(query)):
+                postings = self.postings.get(token)
+                if postings is None:
+                    continue
+
+                idf = math.log(1 + (len(self.lengths) - len(postings) + 0.5) / (len(postings) + 0.5))
+                for id, frequency in postings.items():
+                    normalization = self.k1 * (
+                        1 - self.b + self.b * self.lengths[id] / average_length
+                    )
+                    scores[id] = scores.get(id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                        frequency + normalization
+                    )
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
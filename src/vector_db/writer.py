@@ -0,0 +1,121 @@
+import atexit
+import queue
+import threading
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable
+
+from src.constants import KNOWLEDGE_BASE_MAX_UPSERT_SIZE, KNOWLEDGE_BASE_WRITE_BATCH_SIZE
+from src.vector_db.collections import CollectionCache, collection_cache
+
+
+@dataclass
+class UpsertRequest:
+    collection: str
+    ids: list[str]
+    documents: list[str]
+
+
+class WriteError(RuntimeError):
+    def __init__(self, failures: list[tuple[UpsertRequest, Exception]]):
+        written = ", ".join(
+            f"{len(request.ids)} documents to `{request.collection}`" for request, _ in failures
+        )
+        super().__init__(f"Failed to write {written}")
+        self.failures = failures
+
+
+@dataclass
+class BatchWriter:
+    batch_size: int = field(default=KNOWLEDGE_BASE_WRITE_BATCH_SIZE)
+    collections: CollectionCache = field(default_factory=lambda: collection_cache)
+
+    def __post_init__(self):
+        self.requests: queue.Queue[UpsertRequest | None] = queue.Queue()
+        self.write_handlers: list[Callable[[UpsertRequest], None]] = []
+        self.thread: threading.Thread | None = None
+        self.lock = threading.Lock()
+        # Writes that didn't land, raised by the next `flush` so nobody reads as if they had
+        self.failures: list[tuple[UpsertRequest, Exception]] = []
+
+    def upsert(self, collection: str, *, ids: list[str], documents: list[str]):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="sea-knowledge-base-writer", daemon=True
+                )
+                self.thread.start()
+
+        self.requests.put(UpsertRequest(collection=collection, ids=ids, documents=documents))
+
+    def handle_write(self, handler: Callable[[UpsertRequest], None]):
+        self.write_handlers.append(handler)
+
+    def wait(self):
+        # Lets the queued writes land, leaving their failures to `flush`
+        self.requests.join()
+
+    def flush(self, collection: str | None = None):
+        self.wait()
+        failures: list[tuple[UpsertRequest, Exception]] = []
+        with self.lock:
+            # Other collections' failures wait for whoever reads those
+            kept: list[tuple[UpsertRequest, Exception]] = []
+            for request, error in self.failures:
+                matches = collection is None or request.collection == collection
+                (failures if matches else kept).append((request, error))
+            self.failures = kept
+
+        if len(failures) > 0:
+            raise WriteError(failures) from failures[0][1]
+
+    def close(self):
+        if self.thread is None:
+            return
+
+        self.requests.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.write([request for request in batch if request is not None])
+            for _ in batch:
+                self.requests.task_done()
+
+            if batch[-1] is None:
+                return
+
+    def write(self, batch: list[UpsertRequest]):
+        documents_by_collection: dict[str, dict[str, str]] = {}
+        for request in batch:
+            documents = documents_by_collection.setdefault(request.collection, {})
+            documents.update(zip(request.ids, request.documents))
+
+        for name, documents in documents_by_collection.items():
+            ids = list(documents.keys())
+            # Chroma rejects upserts over its max batch size, a single big `add` can exceed it
+            for start in range(0, len(ids), KNOWLEDGE_BASE_MAX_UPSERT_SIZE):
+                chunk = ids[start : start + KNOWLEDGE_BASE_MAX_UPSERT_SIZE]
+                written = UpsertRequest(
+                    collection=name, ids=chunk, documents=[documents[id] for id in chunk]
+                )
+                try:
+                    self.collections.get(name).upsert(ids=written.ids, documents=written.documents)
+                    for handler in self.write_handlers:
+                        handler(written)
+                except Exception as e:
+                    print(f"[KNOWLEDGE BASE WRITER] Failed to write to `{name}`\n{traceback.format_exc()}")
+                    with self.lock:
+                        self.failures.append((written, e))
+
+
+batch_writer = BatchWriter()
+atexit.register(batch_writer.close)
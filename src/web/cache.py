@@ -0,0 +1,188 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.constants import (
+    HTML_TO_TEXT_VERSION,
+    WEB_CACHE_MAX_BYTES,
+    WEB_CACHE_PATH,
+    WEB_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    text: str | None
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+@dataclass
+class WebCacheStats:
+    hits: int = field(default=0)
+    revalidations: int = field(default=0)
+    misses: int = field(default=0)
+    evictions: int = field(default=0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.revalidations + self.misses
+        return (self.hits + self.revalidations) / lookups if lookups else 0.0
+
+
+@dataclass
+class WebCache:
+    path: str
+    ttl: float = field(default=WEB_CACHE_TTL_SECONDS)
+    max_bytes: int = field(default=WEB_CACHE_MAX_BYTES)
+    # Text extracted by an older version of `html_to_text` is extracted again
+    text_version: int = field(default=HTML_TO_TEXT_VERSION)
+
+    def __post_init__(self):
+        self.connection: sqlite3.Connection | None = None
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = WebCacheStats()
+
+    def db(self) -> sqlite3.Connection:
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    html TEXT NOT NULL,
+                    text TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    text_version INTEGER
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)"
+            )
+            # Kept in memory so writes don't scan the table to check the size budget
+            (self.total_bytes,) = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return self.connection
+
+    def size_of(self, url: str) -> int:
+        row = self.db().execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+        return row[0] if row is not None else 0
+
+    # sqlite blocks, the async variants keep it off the web client's event loop
+    async def aget(self, url: str) -> CachedPage | None:
+        return await asyncio.to_thread(self.get, url)
+
+    async def aput(
+        self,
+        url: str,
+        html: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        await asyncio.to_thread(self.put, url, html, etag=etag, last_modified=last_modified)
+
+    async def arevalidated(self, url: str):
+        await asyncio.to_thread(self.revalidated, url)
+
+    async def aput_text(self, url: str, text: str):
+        await asyncio.to_thread(self.put_text, url, text)
+
+    def get(self, url: str) -> CachedPage | None:
+        with self.lock:
+            row = self.db().execute(
+                """
+                SELECT url, html, CASE WHEN text_version = ? THEN text END, etag, last_modified, fetched_at
+                FROM pages WHERE url = ?
+                """,
+                (self.text_version, url),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.db().execute(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self.db().commit()
+            return CachedPage(*row)
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ):
+        now = time.time()
+        size = len(html.encode())
+        with self.lock:
+            self.total_bytes += size - self.size_of(url)
+            self.db().execute(
+                """
+                INSERT OR REPLACE INTO pages
+                    (url, html, text, etag, last_modified, fetched_at, accessed_at, size)
+                VALUES (?, ?, NULL, ?, ?, ?, ?, ?)
+                """,
+                (url, html, etag, last_modified, now, now, size),
+            )
+            self.evict()
+            self.db().commit()
+
+    def revalidated(self, url: str):
+        now = time.time()
+        with self.lock:
+            self.db().execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self.db().commit()
+
+    def put_text(self, url: str, text: str):
+        with self.lock:
+            row = self.db().execute("SELECT html, size FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+
+            html, previous_size = row
+            size = len(html.encode()) + len(text.encode())
+            self.total_bytes += size - previous_size
+            self.db().execute(
+                "UPDATE pages SET text = ?, text_version = ?, size = ? WHERE url = ?",
+                (text, self.text_version, size, url),
+            )
+            self.evict()
+            self.db().commit()
+
+    def evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        for url, size in self.db().execute(
+            "SELECT url, size FROM pages ORDER BY accessed_at ASC"
+        ).fetchall():
+            self.db().execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.stats.evictions += 1
+            self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                break
+
+
+web_cache = WebCache(path=WEB_CACHE_PATH)
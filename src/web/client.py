@@ -0,0 +1,165 @@
+import asyncio
+import multiprocessing
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Coroutine, TypeVar
+
+import httpx
+
+from src.constants import (
+    HTML_TO_TEXT_PROCESSES,
+    SEARXNG_ENDPOINT,
+    WEB_MAX_CONNECTIONS,
+    WEB_MAX_CONNECTIONS_PER_HOST,
+    WEB_REQUEST_TIMEOUT_SECONDS,
+    WEB_USER_AGENT,
+)
+from src.utils import BackgroundEventLoop, html_to_text
+from src.web.cache import WebCache, web_cache
+
+T = TypeVar("T")
+
+
+@dataclass
+class FetchedPage:
+    rank: int
+    url: str
+    title: str
+    html: str
+    text: str | None = field(default=None)
+
+
+@dataclass
+class WebClient:
+    request_timeout: float = field(default=WEB_REQUEST_TIMEOUT_SECONDS)
+    max_connections: int = field(default=WEB_MAX_CONNECTIONS)
+    max_connections_per_host: int = field(default=WEB_MAX_CONNECTIONS_PER_HOST)
+    user_agent: str = field(default=WEB_USER_AGENT)
+    cache: WebCache | None = field(default_factory=lambda: web_cache)
+    extraction_processes: int = field(default=HTML_TO_TEXT_PROCESSES)
+    searxng_endpoint: str = field(default=SEARXNG_ENDPOINT)
+
+    def __post_init__(self):
+        self.event_loop = BackgroundEventLoop(name="sea-web-client")
+        self.client: httpx.AsyncClient | None = None
+        self.host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.extraction_pool: ProcessPoolExecutor | None = None
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.event_loop.run(coro)
+
+    def get(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers={"User-Agent": self.user_agent},
+                timeout=self.request_timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+        return self.client
+
+    def host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urllib.parse.urlparse(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return self.host_semaphores[host]
+
+    async def search(self, query: str, *, endpoint: str | None = None) -> list[dict[str, Any]]:
+        r = await self.get().get(
+            f"{endpoint or self.searxng_endpoint}/search",
+            params={"q": query, "format": "json"},
+        )
+        r.raise_for_status()
+        return r.json().get("results", [])
+
+    async def fetch_page(self, rank: int, result: dict[str, Any]) -> FetchedPage | None:
+        # A result without a url, a malformed url or a failed request only costs that one page
+        try:
+            return await self.download(rank, result)
+        except Exception:
+            return None
+
+    async def download(self, rank: int, result: dict[str, Any]) -> FetchedPage | None:
+        url: str = result["url"]
+        title: str = result.get("title", "")
+
+        cached = await self.cache.aget(url) if self.cache is not None else None
+        if self.cache is not None and cached is not None and cached.is_fresh(self.cache.ttl):
+            self.cache.stats.hits += 1
+            return FetchedPage(
+                rank=rank, url=url, title=title, html=cached.html, text=cached.text
+            )
+
+        headers: dict[str, str] = {}
+        if cached is not None and cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        async with self.host_semaphore(url):
+            r = await self.get().get(url, headers=headers)
+
+        if self.cache is not None and cached is not None and r.status_code == 304:
+            await self.cache.arevalidated(url)
+            self.cache.stats.revalidations += 1
+            return FetchedPage(
+                rank=rank, url=url, title=title, html=cached.html, text=cached.text
+            )
+
+        if self.cache is not None:
+            self.cache.stats.misses += 1
+
+        if r.status_code != 200:
+            return None
+
+        if self.cache is not None:
+            await self.cache.aput(
+                url,
+                r.text,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+            )
+
+        return FetchedPage(rank=rank, url=url, title=title, html=r.text)
+
+    async def extract_text(self, page: FetchedPage) -> str:
+        if page.text is not None:
+            return page.text
+
+        if self.extraction_processes <= 0:
+            text: str = await asyncio.to_thread(html_to_text, page.html)
+        else:
+            if self.extraction_pool is None:
+                self.extraction_pool = ProcessPoolExecutor(
+                    max_workers=self.extraction_processes,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            text = await asyncio.get_running_loop().run_in_executor(
+                self.extraction_pool, html_to_text, page.html
+            )
+        page.text = text
+        if self.cache is not None:
+            await self.cache.aput_text(page.url, text)
+        return text
+
+    async def fetch_pages(
+        self, results: list[dict[str, Any]]
+    ) -> AsyncGenerator[FetchedPage, None]:
+        # Yields pages as they arrive. Closing the generator cancels whatever is still in flight
+        tasks = [
+            asyncio.create_task(self.fetch_page(rank, result))
+            for rank, result in enumerate(results)
+        ]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page = await next_page
+                if page is not None:
+                    yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+web_client = WebClient()